@@ -101,6 +101,22 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# The stats cache must be shared between every process serving the site,
+# see web/stats.py. Local memory is only suitable for development and tests.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "stats": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "stats",
+        "TIMEOUT": 7 * 24 * 60 * 60,
+    },
+}
+
 # Password storage
 # https://docs.djangoproject.com/en/2.2/topics/auth/passwords/#auth-password-storage
 
@@ -49,6 +49,12 @@ FACEBOOK_ACCESS_TOKEN = os.environ["FACEBOOK_ACCESS_TOKEN"]
 
 CELERY_BROKER_URL = "redis://redis:6379/0"
 
+CACHES["stats"] = {  # noqa: F405
+    "BACKEND": "django.core.cache.backends.redis.RedisCache",
+    "LOCATION": "redis://redis:6379/1",
+    "TIMEOUT": 7 * 24 * 60 * 60,
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": True,
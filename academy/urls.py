@@ -26,6 +26,7 @@ from games.views import (
     InfoViewSet,
     PlayerStatViewSet,
     RankedFacecardsView,
+    StatsSectionViewSet,
     UserViewSet,
 )
 
@@ -34,6 +35,9 @@ router.register("users", UserViewSet)
 router.register("games", GameViewSet)
 router.register("ranked_cards", RankedFacecardsView, basename="ranked_cards")
 router.register("stats", PlayerStatViewSet, basename="stats")
+router.register(
+    r"stats/(?P<season_number>\d+)", StatsSectionViewSet, basename="stats_section"
+)
 router.register("info", InfoViewSet, basename="info")
 
 
@@ -9,7 +9,17 @@ from django.utils.decorators import method_decorator
 from django.utils.html import format_html
 from django.views.generic import CreateView, FormView
 
-from .models import Card, Chug, Game, GamePlayer, User
+from .models import (
+    Card,
+    Chug,
+    Game,
+    GamePlayer,
+    StatsRecalculation,
+    StatsRecalculationPartition,
+    User,
+    retract_stats_of_game,
+    update_stats_on_game_finished,
+)
 from .serializers import GameSerializer
 from .views import update_game
 
@@ -160,9 +170,10 @@ class UploadForm(forms.ModelForm):
 
     def save(self, commit=True):
         game = self.cleaned_data["game"]
+        retract_stats_of_game(game)
         game.dnf = False
         game.save()
-        update_game(game, self.cleaned_data["validated_data"])
+        update_game(game, self.cleaned_data["validated_data"], stats_retracted=True)
         return game
 
     def save_m2m(self):
@@ -182,3 +193,33 @@ class GameAdmin(admin.ModelAdmin):
         else:
             self.inlines = [GamePlayerInline, CardInline]
             return super().get_form(request, obj, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Added again in save_related, when the players and cards are saved
+            retract_stats_of_game(Game.objects.get(id=obj.id))
+            obj.packed_cards = None
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.reset_snapshot()
+        if change and form.instance.has_ended:
+            update_stats_on_game_finished(form.instance)
+
+
+class StatsRecalculationPartitionInline(admin.TabularInline):
+    model = StatsRecalculationPartition
+    readonly_fields = ["phase", "kind", "key", "finished", "items", "seconds"]
+    can_delete = False
+    extra = 0
+
+
+@admin.register(StatsRecalculation)
+class StatsRecalculationAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "started", "finished"]
+    readonly_fields = ["started", "finished", "dispatched_phase", "status"]
+    inlines = [StatsRecalculationPartitionInline]
+
+    def status(self, obj):
+        return format_html("<pre>{}</pre>", obj.status_str())
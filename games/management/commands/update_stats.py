@@ -1,10 +1,45 @@
 from django.core.management.base import BaseCommand
 
-from games.models import recalculate_all_stats
+from games import recalculation
+from games.models import StatsRecalculation
 
 
 class Command(BaseCommand):
-    help = "Updates cached stats"
+    help = "Updates cached stats, resuming an interrupted update if there is one"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of processes to recalculate the stats in",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Recalculate the stats on the Celery workers instead",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start a new update instead of resuming an interrupted one",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Only print the status of the latest update",
+        )
 
     def handle(self, *args, **options):
-        recalculate_all_stats()
+        if options["status"]:
+            latest = StatsRecalculation.objects.order_by("-started").first()
+            self.stdout.write(latest.status_str() if latest else "No updates")
+            return
+
+        r = recalculation.get_or_create_recalculation(restart=options["restart"])
+        if options["celery"]:
+            recalculation.run_on_workers(r)
+            self.stdout.write(f"Sent {r} to the Celery workers")
+        else:
+            recalculation.run_locally(r, processes=options["processes"])
+            self.stdout.write(r.status_str())
@@ -0,0 +1,82 @@
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.models import Chug, PlayerStat, Season
+
+
+class Command(BaseCommand):
+    help = "Compares the incrementally updated player stats with a full recalculation"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--season",
+            type=int,
+            action="append",
+            help="Only compare this season (0 is all time), can be repeated",
+        )
+
+    def handle(self, *args, **options):
+        season_numbers = options["season"] or range(Season.current_season().number + 1)
+        expected = PlayerStat.bulk_calculate(season_numbers)
+        stored = {
+            (ps.user_id, ps.season_number): ps
+            for ps in PlayerStat.objects.filter(season_number__in=season_numbers)
+        }
+
+        # Records are compared by value, since a tie can go to another game
+        # when a game was added back after later games.
+        # best_game and worst_game are compared through their sips.
+        fields = [
+            f
+            for f in PlayerStat._meta.concrete_fields
+            if f.name not in ["id", "user", "season_number", "best_game", "worst_game"]
+        ]
+        chug_durations = dict(
+            Chug.objects.filter(
+                id__in={
+                    ps.fastest_chug_id for ps in [*expected.values(), *stored.values()]
+                }
+            ).values_list("id", "duration_ms")
+        )
+
+        def get_value(ps, f):
+            if f.name == "fastest_chug":
+                return chug_durations.get(ps.fastest_chug_id)
+            if f.name == "record_candidates":
+                return {
+                    record: [v for v, _ in candidates]
+                    for record, candidates in ps.record_candidates.items()
+                }
+            return getattr(ps, f.attname)
+
+        mismatches = 0
+        for key, e in sorted(expected.items()):
+            # Players without any games may not have a row yet
+            s = stored.get(key) or PlayerStat(user_id=key[0], season_number=key[1])
+            for f in fields:
+                actual = get_value(s, f)
+                value = get_value(e, f)
+                if isinstance(value, float) and isinstance(actual, float):
+                    if math.isclose(actual, value, rel_tol=1e-9, abs_tol=1e-6):
+                        continue
+                elif f.name == "record_candidates":
+                    # Removing games leaves fewer candidates
+                    if all(
+                        value.get(record, [])[: len(candidates)] == candidates
+                        for record, candidates in actual.items()
+                    ):
+                        continue
+                elif actual == value:
+                    continue
+
+                mismatches += 1
+                self.stdout.write(
+                    f"user {key[0]}, season {key[1]}: "
+                    f"{f.name} is {actual}, expected {value}"
+                )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} mismatching values")
+
+        self.stdout.write(f"Compared {len(expected)} player stats, all match")
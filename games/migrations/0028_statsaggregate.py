@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0027_playerstat_total_games_with_game_dnf_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatsAggregate",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("season_number", models.PositiveIntegerField()),
+                ("player_count", models.PositiveSmallIntegerField()),
+                ("kind", models.CharField(max_length=32)),
+                ("bucket", models.IntegerField(default=0)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "unique_together": {
+                    ("season_number", "player_count", "kind", "bucket")
+                },
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0028_statsaggregate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatsRecalculation",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started", models.DateTimeField(default=django.utils.timezone.now)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                (
+                    "dispatched_phase",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StatsRecalculationPartition",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("phase", models.PositiveSmallIntegerField()),
+                ("kind", models.CharField(max_length=32)),
+                ("key", models.PositiveIntegerField()),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                ("items", models.PositiveIntegerField(default=0)),
+                ("seconds", models.FloatField(default=0)),
+                (
+                    "recalculation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="partitions",
+                        to="games.statsrecalculation",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("phase", "kind", "key"),
+                "unique_together": {("recalculation", "kind", "key")},
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:06
+
+import datetime
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def season_number_from_date(date):
+    # Must match Season.season_from_date
+    return (date.year - 2013) * 2 + 1 + (date.month >= 7)
+
+
+def fill_chug_totals(apps, schema_editor):
+    # Must match PlayerStat.bulk_calculate
+    Chug = apps.get_model("games", "Chug")
+    GamePlayer = apps.get_model("games", "GamePlayer")
+    PlayerStat = apps.get_model("games", "PlayerStat")
+
+    counted = {
+        "official": True,
+        "dnf": False,
+        "end_datetime__isnull": False,
+    }
+    player_counts = Counter()
+    gameplayers = {}
+    for game_id, position, user_id, dnf in GamePlayer.objects.filter(
+        **{f"game__{k}": v for k, v in counted.items()}
+    ).values_list("game_id", "position", "user_id", "dnf"):
+        player_counts[game_id] += 1
+        gameplayers[game_id, position] = (user_id, dnf)
+
+    current_season_number = season_number_from_date(datetime.date.today())
+    total_chug_time_ms = Counter()
+    total_timed_chugs = Counter()
+    for game_id, index, end_datetime, duration_ms in Chug.objects.filter(
+        duration_ms__isnull=False, **{f"card__game__{k}": v for k, v in counted.items()}
+    ).values_list(
+        "card__game_id", "card__index", "card__game__end_datetime", "duration_ms"
+    ):
+        gp = gameplayers.get((game_id, index % player_counts[game_id]))
+        season_number = season_number_from_date(end_datetime)
+        if not gp or gp[1] or not 1 <= season_number <= current_season_number:
+            continue
+
+        for key in [(gp[0], season_number), (gp[0], 0)]:
+            total_chug_time_ms[key] += duration_ms
+            total_timed_chugs[key] += duration_ms > 0
+
+    stats = list(PlayerStat.objects.all())
+    for ps in stats:
+        key = (ps.user_id, ps.season_number)
+        ps.total_chug_time_ms = total_chug_time_ms[key]
+        ps.total_timed_chugs = total_timed_chugs[key]
+        # Must match PlayerStat.update_average_chug_time
+        if ps.total_chugs > 0:
+            ps.average_chug_time_seconds = ps.total_chug_time_ms / 1000 / ps.total_chugs
+        else:
+            ps.average_chug_time_seconds = None
+
+    PlayerStat.objects.bulk_update(
+        stats,
+        ["total_chug_time_ms", "total_timed_chugs", "average_chug_time_seconds"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0029_statsrecalculation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playerstat",
+            name="total_chug_time_ms",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="playerstat",
+            name="total_timed_chugs",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_chug_totals, migrations.RunPython.noop),
+    ]
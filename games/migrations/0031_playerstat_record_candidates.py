@@ -0,0 +1,138 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:21
+
+import datetime
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Must match PlayerStat.RECORD_CANDIDATES and RECORDS
+RECORD_CANDIDATES = 5
+HIGHER_IS_BETTER = {
+    "best_game": True,
+    "worst_game": False,
+    "fastest_chug": False,
+}
+
+
+def season_number_from_date(date):
+    # Must match Season.season_from_date
+    return (date.year - 2013) * 2 + 1 + (date.month >= 7)
+
+
+def fill_record_candidates(apps, schema_editor):
+    # Must match PlayerStat.bulk_calculate and add_record_candidate
+    Card = apps.get_model("games", "Card")
+    Game = apps.get_model("games", "Game")
+    GamePlayer = apps.get_model("games", "GamePlayer")
+    PlayerStat = apps.get_model("games", "PlayerStat")
+
+    counted = {
+        "official": True,
+        "dnf": False,
+        "end_datetime__isnull": False,
+    }
+    gameplayers = defaultdict(list)
+    for game_id, position, user_id in GamePlayer.objects.filter(
+        dnf=False, **{f"game__{k}": v for k, v in counted.items()}
+    ).values_list("game_id", "position", "user_id"):
+        gameplayers[game_id].append((position, user_id))
+
+    player_counts = Counter(
+        GamePlayer.objects.filter(
+            **{f"game__{k}": v for k, v in counted.items()}
+        ).values_list("game_id", flat=True)
+    )
+
+    sips = Counter()
+    chugs = defaultdict(list)
+    for game_id, index, value, chug_id, duration_ms in (
+        Card.objects.filter(**{f"game__{k}": v for k, v in counted.items()})
+        .order_by("index")
+        .values_list("game_id", "index", "value", "chug__id", "chug__duration_ms")
+    ):
+        if not player_counts[game_id]:
+            continue
+        position = index % player_counts[game_id]
+        sips[game_id, position] += value
+        if duration_ms:
+            chugs[game_id, position].append((duration_ms, chug_id))
+
+    # The values of every record in the order the games finished
+    values = defaultdict(lambda: defaultdict(list))
+    current_season_number = season_number_from_date(datetime.date.today())
+    for game_id, end_datetime in (
+        Game.objects.filter(**counted)
+        .order_by("end_datetime", "id")
+        .values_list("id", "end_datetime")
+    ):
+        season_number = season_number_from_date(end_datetime)
+        if not 1 <= season_number <= current_season_number:
+            continue
+
+        for position, user_id in gameplayers[game_id]:
+            for key in [(user_id, season_number), (user_id, 0)]:
+                for duration_ms, chug_id in chugs[game_id, position]:
+                    values[key]["fastest_chug"].append([duration_ms, chug_id])
+                game_sips = sips[game_id, position]
+                values[key]["best_game"].append([game_sips, game_id])
+                values[key]["worst_game"].append([game_sips, game_id])
+
+    stats = list(PlayerStat.objects.all())
+    for ps in stats:
+        ps.record_candidates = {
+            # The sort is stable, so ties go to the earliest
+            record: sorted(
+                record_values,
+                key=lambda c: c[0],
+                reverse=HIGHER_IS_BETTER[record],
+            )[:RECORD_CANDIDATES]
+            for record, record_values in values[ps.user_id, ps.season_number].items()
+        }
+
+    PlayerStat.objects.bulk_update(stats, ["record_candidates"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0030_playerstat_total_chug_time_ms"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playerstat",
+            name="record_candidates",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name="playerstat",
+            name="best_game",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="games.game",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="playerstat",
+            name="fastest_chug",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="games.chug",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="playerstat",
+            name="worst_game",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="games.game",
+            ),
+        ),
+        migrations.RunPython(fill_record_candidates, migrations.RunPython.noop),
+    ]
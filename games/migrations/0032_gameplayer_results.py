@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0031_playerstat_record_candidates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gameplayer",
+            name="total_cards",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="gameplayer",
+            name="total_sips",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="gameplayer",
+            name="total_time_ms",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="gameplayer",
+            name="total_timed_turns",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0032_gameplayer_results"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="packed_cards",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:59
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def season_number_from_date(date):
+    # Must match Season.season_from_date
+    return (date.year - 2013) * 2 + 1 + (date.month >= 7)
+
+
+def fill_season_number_and_player_count(apps, schema_editor):
+    Game = apps.get_model("games", "Game")
+    games = list(
+        Game.objects.annotate(gameplayer_count=Count("gameplayer")).only(
+            "end_datetime", "start_datetime", "dnf"
+        )
+    )
+    for game in games:
+        # Must match Game.calculate_season_number
+        if game.end_datetime:
+            game.season_number = season_number_from_date(game.end_datetime)
+        elif game.dnf and game.start_datetime:
+            game.season_number = season_number_from_date(game.start_datetime)
+        game.player_count = game.gameplayer_count
+
+    Game.objects.bulk_update(games, ["season_number", "player_count"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0033_game_packed_cards"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="player_count",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="season_number",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["season_number", "player_count"],
+                name="games_game_season__516228_idx",
+            ),
+        ),
+        migrations.RunPython(
+            fill_season_number_and_player_count, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Must match games.ranking.RANKINGS: (ordering, game key)
+RANKINGS = [
+    ("-total_sips", None),
+    ("-best_game_sips", "best_game"),
+    ("worst_game_sips", "worst_game"),
+    ("-total_chugs", None),
+    ("fastest_chug__duration_ms", "fastest_chug__card__game"),
+    ("-total_time_played_seconds", None),
+]
+
+
+def fill_rankings(apps, schema_editor):
+    # Must match RankingEntry.update_ranking and Ranking.get_qs
+    PlayerStat = apps.get_model("games", "PlayerStat")
+    RankingEntry = apps.get_model("games", "RankingEntry")
+
+    season_numbers = (
+        PlayerStat.objects.order_by().values_list("season_number", flat=True).distinct()
+    )
+    entries = []
+    for season_number in season_numbers:
+        for ordering, game_key in RANKINGS:
+            value_key = ordering.lstrip("-")
+            fields = ["user_id", value_key]
+            if game_key:
+                fields.append(game_key)
+
+            stats = (
+                PlayerStat.objects.filter(
+                    season_number=season_number,
+                    total_games__gt=0,
+                    **{f"{value_key}__isnull": False},
+                )
+                .order_by(ordering, "user_id")
+                .values_list(*fields)
+            )
+            for rank, (user_id, value, *game) in enumerate(stats, 1):
+                entries.append(
+                    RankingEntry(
+                        season_number=season_number,
+                        ranking_key=value_key.split("__")[0],
+                        rank=rank,
+                        user_id=user_id,
+                        value=value,
+                        game_id=game[0] if game else None,
+                    )
+                )
+
+    RankingEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0034_game_season_number_player_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RankingEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("season_number", models.PositiveIntegerField()),
+                ("ranking_key", models.CharField(max_length=32)),
+                ("rank", models.PositiveIntegerField()),
+                ("value", models.FloatField()),
+                (
+                    "game",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="games.game",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["season_number", "ranking_key", "rank"],
+                        name="games_ranki_season__8091d5_idx",
+                    )
+                ],
+                "unique_together": {("season_number", "ranking_key", "user")},
+            },
+        ),
+        migrations.RunPython(fill_rankings, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,35 @@
 import datetime
 import os
 import secrets
+from collections import Counter, defaultdict
 
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
-from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Subquery
+from django.db import connection, models, transaction
+from django.db.models import (
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce, Mod, TruncDate
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.templatetags.static import static
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from PIL import Image
 from tqdm import tqdm
 
 from academy.utils import get_absolute_url
 
+from .packed_cards import PackedCards, pack_cards
 from .shuffle_indices import shuffle_with_indices
 from .utils import format_sips
 
@@ -60,16 +76,16 @@ def filter_season(qs, season, key=None, should_include_live=False):
     else:
         key = ""
 
-    end_key = key + "end_datetime"
+    season_key = key + "season_number"
 
-    q = q_between(end_key, season.start_datetime, season.end_datetime)
-    q |= Q(**{f"{key}dnf": True}) & q_between(
-        f"{key}start_datetime", season.start_datetime, season.end_datetime
-    )
+    if season == all_time_season:
+        q = q_between(season_key, 1, Season.current_season().number)
+    else:
+        q = Q(**{season_key: season.number})
 
     includes_live = season == all_time_season or Season.current_season() == season
     if includes_live and should_include_live:
-        q |= Q(**{f"{end_key}__isnull": True, f"{key}dnf": False})
+        q |= Q(**{f"{key}end_datetime__isnull": True, f"{key}dnf": False})
 
     return qs.filter(q)
 
@@ -83,11 +99,7 @@ def filter_player_count(qs, player_count, key=None):
     else:
         key = ""
 
-    gameplayer_key = key + "gameplayer"
-
-    return qs.annotate(player_count=Count(gameplayer_key)).filter(
-        player_count=player_count
-    )
+    return qs.filter(**{f"{key}player_count": player_count})
 
 
 def filter_season_and_player_count(qs, season, player_count, key=None):
@@ -97,41 +109,603 @@ def filter_season_and_player_count(qs, season, player_count, key=None):
 def recalculate_all_stats():
     PlayerStat.recalculate_all()
     GamePlayerStat.recalculate_all()
+    StatsAggregate.recalculate_all()
+
+
+def update_stats_on_game_finished(game, sign=1):
+    snapshot = GameSnapshot(game)
+    game.update_packed_cards(sign=sign, snapshot=snapshot)
+    PlayerStat.update_on_game_finished(game, sign=sign, snapshot=snapshot)
+    GamePlayer.update_on_game_finished(game, sign=sign, snapshot=snapshot)
+    GamePlayerStat.update_on_game_finished(game, sign=sign, snapshot=snapshot)
+    StatsAggregate.update_on_game_finished(game, sign=sign, snapshot=snapshot)
+
+
+def retract_stats_of_game(game):
+    """
+    Removes what an ended game has added to the stats, before the game is deleted
+    or changed. Must be called in the same transaction as the change.
+    """
+    if game.has_ended:
+        update_stats_on_game_finished(game, sign=-1)
+
+
+@receiver(pre_delete, sender="games.Game")
+def on_game_deleted(*, instance, **_kwargs):
+    retract_stats_of_game(instance)
+
+
+class DurationBucket(Func):
+    """
+    Index of the histogram bucket of an interval on PostgreSQL,
+    which matches StatsAggregate.get_duration_bucket.
+    """
+
+    output_field = models.IntegerField()
+    template = "TRUNC(EXTRACT(EPOCH FROM %(expressions)s) / %(bucket_span_seconds)s)"
+
+
+class GameSnapshot:
+    """
+    A game with its players, cards and chugs loaded in at most two queries,
+    which the computations on the game run on.
+    The players and the cards are each loaded when they are first used.
+    The lists of player stats are indexed by player position.
+    """
+
+    PLAYER_SLOTS = ["gameplayers", "player_count"]
+    CARD_SLOTS = [
+        "cards",
+        "sips",
+        "aces",
+        "chugs",
+        "cards_drawn",
+        "turn_time_ms",
+        "timed_turns",
+    ]
+
+    __slots__ = ["game", "duration", *PLAYER_SLOTS, *CARD_SLOTS]
+
+    def __init__(self, game):
+        self.game = game
+        # Only the duration of games that didn't DNF is used for stats
+        self.duration = None if game.dnf else self.get_duration()
+
+    def __getattr__(self, name):
+        # Only called for slots that haven't been loaded yet
+        if name in self.PLAYER_SLOTS:
+            self.load_players()
+        elif name in self.CARD_SLOTS:
+            self.load_cards()
+        else:
+            raise AttributeError(name)
+        return getattr(self, name)
+
+    def load_players(self):
+        self.gameplayers = list(self.game.ordered_gameplayers().select_related("user"))
+        self.player_count = len(self.gameplayers)
+
+    def load_cards(self):
+        n = self.player_count
+        self.cards = list(self.game.ordered_cards().select_related("chug"))
+        self.sips = [0] * n
+        self.aces = [0] * n
+        self.chugs = [[] for _ in range(n)]
+        self.cards_drawn = [0] * n
+        for c in self.cards:
+            position = c.index % n
+            self.sips[position] += c.value
+            self.aces[position] += c.value == Chug.VALUE
+            self.cards_drawn[position] += 1
+            chug = getattr(c, "chug", None)
+            if chug:
+                self.chugs[position].append(chug)
+
+        # None if the cards have no times
+        if self.cards and self.cards[0].start_delta_ms:
+            self.turn_time_ms = [0] * n
+            self.timed_turns = [0] * n
+            for i, dt in enumerate(self.get_turn_durations()):
+                self.turn_time_ms[i % n] += dt
+                self.timed_turns[i % n] += 1
+        else:
+            self.turn_time_ms = [None] * n
+            self.timed_turns = [None] * n
+
+    def get_total_card_count(self):
+        return self.player_count * len(Card.VALUES)
+
+    def get_last_activity_time(self):
+        if self.game.end_datetime:
+            return self.game.end_datetime
+
+        if self.cards:
+            return self.cards[-1].drawn_datetime
+
+        return self.game.start_datetime
+
+    def all_cards_done(self):
+        if len(self.cards) < self.get_total_card_count():
+            return False
+
+        return self.cards[-1].finish_start_delta_ms is not None
+
+    def get_duration(self):
+        game = self.game
+        if game.dnf:
+            return self.get_last_activity_time() - game.start_datetime
+
+        if not (game.start_datetime and game.end_datetime):
+            return None
+
+        return game.end_datetime - game.start_datetime
+
+    def cards_by_round(self):
+        n = self.player_count
+        for i in range(Game.TOTAL_ROUNDS):
+            round_cards = self.cards[i * n : (i + 1) * n]
+            yield round_cards + [None] * (n - len(round_cards))
+
+    def get_turn_durations(self):
+        prev_finish_start_delta_ms = 0
+        for c in self.cards:
+            if c.finish_start_delta_ms is None:
+                return
+
+            if prev_finish_start_delta_ms is not None:
+                yield c.finish_start_delta_ms - prev_finish_start_delta_ms
+
+            prev_finish_start_delta_ms = c.finish_start_delta_ms
+
+    def get_player_stats(self):
+        # Note that total_drawn and total_done,
+        # can differ for one player, if the game hasn't ended.
+        def div_or_none(a, b):
+            if a is None or not b:
+                return None
+            return a / b
+
+        game = self.game
+        ordered_gameplayers = self.gameplayers
+        n = self.player_count
+        last_sip = None
+        if game.is_completed and all(
+            gp.total_sips is not None for gp in ordered_gameplayers
+        ):
+            # Stored when the game finished, so the cards aren't loaded
+            total_sips = [gp.total_sips for gp in ordered_gameplayers]
+            total_drawn = [gp.total_cards for gp in ordered_gameplayers]
+            total_times = [gp.total_time_ms for gp in ordered_gameplayers]
+            total_done = [gp.total_timed_turns for gp in ordered_gameplayers]
+        else:
+            total_sips = self.sips
+            total_drawn = self.cards_drawn
+            total_times = self.turn_time_ms
+            total_done = self.timed_turns
+            if self.cards:
+                last_card = self.cards[-1]
+                last_sip = (last_card.index % n, last_card.value)
+
+        for i in range(n):
+            full_beers = total_sips[i] // game.sips_per_beer
+            extra_sips = total_sips[i] % game.sips_per_beer
+
+            if not game.start_datetime:
+                time_per_sip = None
+            elif last_sip and last_sip[0] == i and not game.is_completed:
+                time_per_sip = div_or_none(
+                    total_times[i], (total_sips[i] - last_sip[1])
+                )
+            else:
+                time_per_sip = div_or_none(total_times[i], total_sips[i])
+
+            gp = ordered_gameplayers[i]
+
+            yield {
+                "id": gp.user.id,
+                "username": gp.user.username,
+                "dnf": gp.dnf,
+                "dnf_datetime": gp.dnf_datetime,
+                "total_sips": total_sips[i],
+                "sips_per_turn": div_or_none(total_sips[i], total_drawn[i]),
+                "full_beers": full_beers,
+                "extra_sips": extra_sips,
+                "total_time": total_times[i],
+                "time_per_turn": div_or_none(total_times[i], total_done[i]),
+                "time_per_sip": time_per_sip,
+            }
+
+
+class StatsAggregate(models.Model):
+    """
+    A counter used by the stats page for a season and player count.
+
+    The counters are updated by applying the contribution of a single game,
+    when it finishes or is deleted, so the stats page never has to scan
+    every game in a season. Every update also increments the version counter.
+    """
+
+    class Meta:
+        unique_together = [("season_number", "player_count", "kind", "bucket")]
+
+    # Used as player_count for counters over every player count
+    ALL_PLAYER_COUNTS = 0
+
+    VERSION = "version"
+    TOTAL_GAMES = "total_games"
+    TOTAL_DNF = "total_dnf"
+    TOTAL_SIPS = "total_sips"
+    TOTAL_DURATION_US = "total_duration_us"
+    # Histograms, where bucket is the value
+    SIPS = "sips"
+    CHUGS = "chugs"
+    # Histograms, where bucket is the index of the bucket
+    DURATION = "duration"
+    CHUG_DURATION = "chug_duration"
+    # Games played per day, where bucket is the ordinal of the date
+    HEATMAP = "heatmap"
+
+    DURATION_BUCKETS = 60
+    MAX_DURATIONS = {
+        DURATION: datetime.timedelta(hours=4),
+        CHUG_DURATION: datetime.timedelta(seconds=15),
+    }
+
+    season_number = models.PositiveIntegerField()
+    player_count = models.PositiveSmallIntegerField()
+    kind = models.CharField(max_length=32)
+    bucket = models.IntegerField(default=0)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def get_bucket_span(cls, kind):
+        return cls.MAX_DURATIONS[kind] / cls.DURATION_BUCKETS
+
+    @classmethod
+    def get_duration_bucket(cls, kind, duration):
+        if duration > cls.MAX_DURATIONS[kind]:
+            return None
+        return int(duration / cls.get_bucket_span(kind))
+
+    @classmethod
+    def get_game_counts(cls, game, snapshot=None):
+        snapshot = snapshot or GameSnapshot(game)
+        counts = Counter()
+        counts[cls.TOTAL_GAMES, 0] += 1
+        counts[cls.TOTAL_DNF, 0] += game.dnf
+        counts[cls.TOTAL_SIPS, 0] += sum(snapshot.sips)
+
+        if game.start_datetime and game.end_datetime:
+            duration = game.end_datetime - game.start_datetime
+            counts[cls.TOTAL_DURATION_US, 0] += duration // datetime.timedelta(
+                microseconds=1
+            )
+            bucket = cls.get_duration_bucket(cls.DURATION, duration)
+            if not game.dnf and bucket is not None:
+                counts[cls.DURATION, bucket] += 1
+
+        for chugs in snapshot.chugs:
+            for chug in chugs:
+                if chug.duration_ms is not None:
+                    bucket = cls.get_duration_bucket(
+                        cls.CHUG_DURATION,
+                        datetime.timedelta(milliseconds=chug.duration_ms),
+                    )
+                    if bucket is not None:
+                        counts[cls.CHUG_DURATION, bucket] += 1
+
+        # Must match GamePlayerStat
+        if game.is_completed:
+            for v in snapshot.sips:
+                counts[cls.SIPS, v] += 1
+            for v in snapshot.aces:
+                counts[cls.CHUGS, v] += 1
+
+        if game.end_datetime:
+            date = timezone.localdate(game.end_datetime)
+            counts[cls.HEATMAP, date.toordinal()] += 1
+
+        return counts
+
+    @classmethod
+    def apply_counts(cls, season_number, player_count, counts, sign=1):
+        deltas = {}
+        for s in [season_number, all_time_season.number]:
+            for p in [player_count, cls.ALL_PLAYER_COUNTS]:
+                deltas[s, p, cls.VERSION, 0] = 1
+                for (kind, bucket), v in counts.items():
+                    if v != 0:
+                        deltas[s, p, kind, bucket] = sign * v
+
+        q = Q()
+        for s, p, kind, bucket in deltas:
+            q |= Q(season_number=s, player_count=p, kind=kind, bucket=bucket)
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [
+                    cls(season_number=s, player_count=p, kind=kind, bucket=bucket)
+                    for s, p, kind, bucket in deltas
+                ],
+                ignore_conflicts=True,
+            )
+            aggregates = list(cls.objects.select_for_update().filter(q))
+            for a in aggregates:
+                a.value += deltas[a.season_number, a.player_count, a.kind, a.bucket]
+            cls.objects.bulk_update(aggregates, ["value"])
+            cls.objects.filter(q, value=0).exclude(kind=cls.VERSION).delete()
+
+    @classmethod
+    def update_on_game_finished(cls, game, sign=1, snapshot=None):
+        season = game.get_season()
+        if not season:
+            return
+
+        snapshot = snapshot or GameSnapshot(game)
+        counts = cls.get_game_counts(game, snapshot)
+        cls.apply_counts(season.number, snapshot.player_count, counts, sign)
+
+    @classmethod
+    def get_version(cls, season, player_count):
+        aggregate = cls.objects.filter(
+            season_number=season.number,
+            player_count=player_count or cls.ALL_PLAYER_COUNTS,
+            kind=cls.VERSION,
+        ).first()
+        return aggregate.value if aggregate else 0
+
+    @classmethod
+    def get_versions(cls):
+        return {
+            (a.season_number, a.player_count): a.value
+            for a in cls.objects.filter(kind=cls.VERSION)
+        }
+
+    @classmethod
+    def get_counts(cls, season, player_count):
+        counts = defaultdict(dict)
+        for a in cls.objects.filter(
+            season_number=season.number,
+            player_count=player_count or cls.ALL_PLAYER_COUNTS,
+        ).order_by("kind", "bucket"):
+            counts[a.kind][a.bucket] = a.value
+        return counts
+
+    @classmethod
+    def get_totals_by_player_count(cls, season, kind):
+        return dict(
+            cls.objects.filter(season_number=season.number, kind=kind)
+            .exclude(player_count=cls.ALL_PLAYER_COUNTS)
+            .order_by()
+            .values_list("player_count")
+            .annotate(Sum("value"))
+        )
+
+    @staticmethod
+    def add_bucket_counts(counts, kind, buckets):
+        for b in buckets.annotate(count=Count("id")).order_by():
+            counts[kind, b["bucket"]] += b["count"]
+
+    @classmethod
+    def calculate_counts(cls, season, player_count):
+        # Calculates the counters from scratch without using the stored ones
+        counts = Counter()
+
+        games = filter_season_and_player_count(Game.objects, season, player_count)
+        game_ids = games.values("id")
+
+        game_sips = (
+            Card.objects.filter(game=OuterRef("id"))
+            .order_by()
+            .values("game")
+            .annotate(sips=Sum("value"))
+            .values("sips")
+        )
+        summary = (
+            Game.add_durations(Game.objects.filter(id__in=game_ids))
+            .annotate(sips=Subquery(game_sips))
+            .aggregate(
+                total_games=Count("id"),
+                total_dnf=Count("id", filter=Q(dnf=True)),
+                total_sips=Sum("sips"),
+                total_duration=Sum("duration"),
+            )
+        )
+        counts[cls.TOTAL_GAMES, 0] = summary["total_games"]
+        counts[cls.TOTAL_DNF, 0] = summary["total_dnf"]
+        counts[cls.TOTAL_SIPS, 0] = summary["total_sips"] or 0
+        total_duration = summary["total_duration"] or datetime.timedelta(0)
+        counts[cls.TOTAL_DURATION_US, 0] = total_duration // datetime.timedelta(
+            microseconds=1
+        )
+
+        for kind, stats in [
+            (cls.SIPS, GamePlayerStat.get_sips_distribution(season, player_count)),
+            (cls.CHUGS, GamePlayerStat.get_chugs_distribution(season, player_count)),
+        ]:
+            for s in stats:
+                counts[kind, s["value"]] = s["value__count"]
+
+        game_durations = Game.add_durations(
+            Game.objects.filter(id__in=game_ids)
+        ).filter(dnf=False, duration__lte=cls.MAX_DURATIONS[cls.DURATION])
+        if connection.vendor == "postgresql":
+            cls.add_bucket_counts(
+                counts,
+                cls.DURATION,
+                game_durations.values(
+                    bucket=DurationBucket(
+                        "duration",
+                        bucket_span_seconds=cls.get_bucket_span(
+                            cls.DURATION
+                        ).total_seconds(),
+                    )
+                ),
+            )
+        else:
+            # SQLite can't divide durations, so bucket them here instead
+            for g in game_durations.values("duration"):
+                bucket = cls.get_duration_bucket(cls.DURATION, g["duration"])
+                counts[cls.DURATION, bucket] += 1
+
+        ms = datetime.timedelta(milliseconds=1)
+        chugs = Chug.objects.filter(
+            card__game__in=game_ids,
+            duration_ms__lte=cls.MAX_DURATIONS[cls.CHUG_DURATION] // ms,
+        )
+        cls.add_bucket_counts(
+            counts,
+            cls.CHUG_DURATION,
+            chugs.values(
+                bucket=F("duration_ms") / (cls.get_bucket_span(cls.CHUG_DURATION) // ms)
+            ),
+        )
 
+        for date, count in Game.count_by_end_date(
+            Game.objects.filter(id__in=game_ids)
+        ).items():
+            counts[cls.HEATMAP, date.toordinal()] = count
 
-def update_stats_on_game_finished(game):
-    PlayerStat.update_on_game_finished(game)
-    GamePlayerStat.update_on_game_finished(game)
+        return counts
+
+    @classmethod
+    def recalculate_all(cls):
+        with transaction.atomic():
+            cls.objects.exclude(kind=cls.VERSION).delete()
+            for season in tqdm(get_all_seasons()):
+                cls.recalculate_season(season)
+
+    @classmethod
+    def recalculate_season(cls, season):
+        with transaction.atomic():
+            cls.objects.filter(season_number=season.number).exclude(
+                kind=cls.VERSION
+            ).delete()
+            for player_count in get_all_player_counts():
+                counts = cls.calculate_counts(season, player_count)
+                counts[cls.VERSION, 0] = 0
+                cls.objects.bulk_create(
+                    [
+                        cls(
+                            season_number=season.number,
+                            player_count=player_count or cls.ALL_PLAYER_COUNTS,
+                            kind=kind,
+                            bucket=bucket,
+                            value=v,
+                        )
+                        for (kind, bucket), v in counts.items()
+                        if v != 0 or kind == cls.VERSION
+                    ],
+                    ignore_conflicts=True,
+                )
+            cls.objects.filter(season_number=season.number, kind=cls.VERSION).update(
+                value=F("value") + 1
+            )
 
 
 class GamePlayerStat(models.Model):
+    # Number of games loaded at a time by recalculate_games
+    REBUILD_CHUNK_SIZE = 500
+
     gameplayer = models.OneToOneField("GamePlayer", on_delete=models.CASCADE)
     value_sum = models.PositiveIntegerField(default=0)
     chugs = models.PositiveIntegerField(default=0)
 
     @classmethod
     def recalculate_all(cls):
-        GamePlayerStat.objects.all().delete()
-        for game in tqdm(Game.objects.all()):
-            cls.update_on_game_finished(game)
+        cls.recalculate_games(Game.objects.all())
+
+    @classmethod
+    def recalculate_games(cls, games):
+        GamePlayerStat.objects.filter(gameplayer__game__in=games).delete()
+
+        # Load a bounded number of games at a time, no matter how many there are
+        game_ids = (
+            games.filter(end_datetime__isnull=False)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        last_id = None
+        while True:
+            chunk = game_ids if last_id is None else game_ids.filter(id__gt=last_id)
+            chunk = list(chunk[: cls.REBUILD_CHUNK_SIZE])
+            if not chunk:
+                break
+            last_id = chunk[-1]
+
+            gameplayers = defaultdict(list)
+            for gp_id, game_id, position in GamePlayer.objects.filter(
+                game_id__in=chunk
+            ).values_list("id", "game_id", "position"):
+                gameplayers[game_id].append((gp_id, position))
+
+            # Games without players have no one to give their cards to
+            chunk = [game_id for game_id in chunk if game_id in gameplayers]
+
+            # Must match GameSnapshot
+            value_sums = Counter()
+            chugs = Counter()
+
+            def add_card(game_id, index, value):
+                key = (game_id, index % len(gameplayers[game_id]))
+                value_sums[key] += value
+                chugs[key] += value == Chug.VALUE
+
+            # Only games not packed yet have their card rows loaded
+            packed_game_ids = []
+            for game_id, packed_cards in Game.objects.filter(
+                id__in=chunk, packed_cards__isnull=False
+            ).values_list("id", "packed_cards"):
+                packed_game_ids.append(game_id)
+                for index, value in enumerate(PackedCards(packed_cards).values):
+                    add_card(game_id, index, value)
+
+            for game_id, index, value in (
+                Card.objects.filter(game_id__in=chunk)
+                .exclude(game_id__in=packed_game_ids)
+                .values_list("game_id", "index", "value")
+            ):
+                add_card(game_id, index, value)
+
+            cls.objects.bulk_create(
+                [
+                    cls(
+                        gameplayer_id=gp_id,
+                        value_sum=value_sums[game_id, position],
+                        chugs=chugs[game_id, position],
+                    )
+                    for game_id, gps in gameplayers.items()
+                    for gp_id, position in gps
+                ],
+                batch_size=1000,
+            )
 
     @classmethod
-    def update_on_game_finished(cls, game):
+    def update_on_game_finished(cls, game, sign=1, snapshot=None):
         if not game.is_completed:
             return
 
+        if sign < 0:
+            cls.objects.filter(gameplayer__game=game).delete()
+            return
+
+        snapshot = snapshot or GameSnapshot(game)
+        existing = {
+            s.gameplayer_id: s
+            for s in cls.objects.filter(gameplayer__in=snapshot.gameplayers)
+        }
         stats = [
-            GamePlayerStat.objects.get_or_create(gameplayer=gp)[0]
-            for gp in game.ordered_gameplayers()
+            existing.get(gp.id) or cls(gameplayer=gp) for gp in snapshot.gameplayers
         ]
 
-        for round_cards in game.cards_by_round():
-            for i, c in enumerate(round_cards):
-                stats[i].value_sum += c.value
-                stats[i].chugs += c.value == Chug.VALUE
+        for gp, s in zip(snapshot.gameplayers, stats):
+            s.value_sum += snapshot.sips[gp.position]
+            s.chugs += snapshot.aces[gp.position]
 
-        for s in stats:
-            s.save()
+        cls.objects.bulk_update(
+            [s for s in stats if s.id], ["value_sum", "chugs"], batch_size=1000
+        )
+        cls.objects.bulk_create([s for s in stats if not s.id])
 
     @classmethod
     def get_stats_with_player_count(cls, season, player_count):
@@ -176,10 +750,10 @@ class PlayerStat(models.Model):
     total_sips = models.PositiveIntegerField(default=0)
 
     best_game = models.ForeignKey(
-        "Game", on_delete=models.CASCADE, null=True, related_name="+"
+        "Game", on_delete=models.SET_NULL, null=True, related_name="+"
     )
     worst_game = models.ForeignKey(
-        "Game", on_delete=models.CASCADE, null=True, related_name="+"
+        "Game", on_delete=models.SET_NULL, null=True, related_name="+"
     )
     best_game_sips = models.PositiveIntegerField(null=True)
     worst_game_sips = models.PositiveIntegerField(null=True)
@@ -187,46 +761,283 @@ class PlayerStat(models.Model):
     total_chugs = models.PositiveIntegerField(default=0)
 
     fastest_chug = models.ForeignKey(
-        "Chug", on_delete=models.CASCADE, null=True, related_name="+"
+        "Chug", on_delete=models.SET_NULL, null=True, related_name="+"
     )
 
     average_chug_time_seconds = models.FloatField(null=True)
 
+    # Exact sums, so games can be added and removed without drifting
+    total_chug_time_ms = models.PositiveBigIntegerField(default=0)
+    total_timed_chugs = models.PositiveIntegerField(default=0)
+
+    # The next best values of each record as [value, id],
+    # used to replace a record when its game is removed
+    record_candidates = models.JSONField(default=dict)
+
+    RECORD_CANDIDATES = 5
+
+    # Record: (field with its value, field counting the values, if higher is better)
+    RECORDS = {
+        "best_game": ("best_game_sips", "total_games", True),
+        "worst_game": ("worst_game_sips", "total_games", False),
+        "fastest_chug": (None, "total_timed_chugs", False),
+    }
+
     @classmethod
-    def update_on_game_finished(cls, game):
-        season = game.get_season()
-        for s in [season, all_time_season]:
-            for player in game.players.all():
-                ps, _ = PlayerStat.objects.get_or_create(
-                    user=player, season_number=s.number
-                )
-                ps.update_from_new_game(game)
+    def update_on_game_finished(cls, game, sign=1, snapshot=None):
+        snapshot = snapshot or GameSnapshot(game)
+        season_numbers = cls.get_game_season_numbers(game.season_number)
+        user_ids = [gp.user_id for gp in snapshot.gameplayers]
+
+        def get_stats():
+            return {
+                (ps.user_id, ps.season_number): ps
+                for ps in cls.objects.filter(
+                    user_id__in=user_ids, season_number__in=season_numbers
+                ).select_related("fastest_chug")
+            }
+
+        stats = get_stats()
+        missing = [
+            cls(user_id=user_id, season_number=season_number)
+            for user_id in user_ids
+            for season_number in season_numbers
+            if (user_id, season_number) not in stats
+        ]
+        if missing:
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            stats = get_stats()
+
+        if not game.official:
+            return
+
+        recalculate = defaultdict(set)
+        for gp in snapshot.gameplayers:
+            for season_number in season_numbers:
+                ps = stats[gp.user_id, season_number]
+                if sign > 0:
+                    ps.add_game_stats(snapshot, gp)
+                elif not ps.remove_game_stats(snapshot, gp):
+                    recalculate[gp.user].add(season_number)
+
+        cls.objects.bulk_update(
+            stats.values(),
+            [
+                f.name
+                for f in cls._meta.concrete_fields
+                if f.name not in ["id", "user", "season_number"]
+            ],
+        )
+
+        RankingEntry.update_rankings(season_numbers, user_ids)
+
+        def recalculate_stats():
+            for user, user_season_numbers in recalculate.items():
+                cls.bulk_recalculate(user_season_numbers, user=user)
+
+        if recalculate:
+            # The removed game is only gone from the database once the change
+            # is committed (and other games might be removed in the same change)
+            transaction.on_commit(recalculate_stats)
 
     @classmethod
     def recalculate_all(cls):
-        for season_number in tqdm(range(Season.current_season().number + 1)):
-            cls.recalculate_season(Season(season_number))
+        cls.bulk_recalculate(range(Season.current_season().number + 1))
 
     @classmethod
     def recalculate_season(cls, season):
-        for user in tqdm(User.objects.all()):
-            ps, _ = PlayerStat.objects.get_or_create(
-                user=user, season_number=season.number
-            )
-            ps.recalculate()
+        cls.bulk_recalculate([season.number])
 
     @classmethod
     def recalculate_user(cls, user):
-        for season_number in tqdm(range(Season.current_season().number + 1)):
-            ps, _ = PlayerStat.objects.get_or_create(
-                user=user, season_number=season_number
+        cls.bulk_recalculate(range(Season.current_season().number + 1), user=user)
+
+    @staticmethod
+    def get_game_season_numbers(season_number):
+        # Must match filter_season
+        if season_number and 1 <= season_number <= Season.current_season().number:
+            return {season_number, all_time_season.number}
+        return set()
+
+    @classmethod
+    def bulk_recalculate(cls, season_numbers, user=None):
+        """
+        Recalculates the stats of every user (or a single user) in the given seasons
+        with a few grouped queries, instead of going through every game card by card.
+        """
+        season_numbers = set(season_numbers)
+        stats = cls.bulk_calculate(season_numbers, user=user)
+
+        fields = [
+            f.name
+            for f in cls._meta.concrete_fields
+            if f.name not in ["id", "user", "season_number"]
+        ]
+        with transaction.atomic():
+            existing = PlayerStat.objects.filter(season_number__in=season_numbers)
+            if user:
+                existing = existing.filter(user=user)
+            for ps_id, user_id, season_number in existing.values_list(
+                "id", "user_id", "season_number"
+            ):
+                stats[user_id, season_number].id = ps_id
+
+            cls.objects.bulk_update(
+                [ps for ps in stats.values() if ps.id], fields, batch_size=1000
+            )
+            cls.objects.bulk_create(
+                [ps for ps in stats.values() if not ps.id], batch_size=1000
+            )
+            RankingEntry.update_rankings(
+                season_numbers, user_ids=[user.id] if user else None
             )
-            ps.recalculate()
+
+    @classmethod
+    def bulk_calculate(cls, season_numbers, user=None):
+        """
+        Returns unsaved stats of every user (or a single user) in the given seasons,
+        keyed by (user id, season number).
+
+        Ties for best/worst game and fastest chug go to the earliest game,
+        like when the stats are updated as games finish.
+        """
+        season_numbers = set(season_numbers)
+
+        # Only the games of the requested seasons, where all time has every season
+        if all_time_season.number in season_numbers:
+            seasons = [all_time_season]
+        else:
+            seasons = [Season(n) for n in season_numbers]
+        games = Game.objects.none()
+        for season in seasons:
+            games |= filter_season(Game.objects.filter(official=True), season)
+
+        gameplayers = GamePlayer.objects.filter(game__in=games)
+        users = User.objects.all()
+        if user:
+            games = games.filter(
+                id__in=GamePlayer.objects.filter(user=user).values("game_id")
+            )
+            gameplayers = gameplayers.filter(user=user)
+            users = users.filter(id=user.id)
+
+        # The position of the player drawing a card
+        position = Mod(
+            "index",
+            Subquery(
+                GamePlayer.objects.filter(game=OuterRef("game"))
+                .order_by()
+                .values("game")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+        )
+
+        results = {
+            (r["game_id"], r["position"]): r
+            for r in Card.objects.filter(game__in=games)
+            .annotate(position=position)
+            .values("game_id", "position")
+            .annotate(
+                sips=Sum("value"),
+                chugs=Count("chug"),
+                chug_time_ms=Sum("chug__duration_ms"),
+            )
+            .order_by()
+        }
+
+        chugs = defaultdict(list)
+        for chug_id, game_id, chug_position, duration_ms in (
+            Card.objects.filter(game__in=games, chug__duration_ms__gt=0)
+            .annotate(position=position)
+            .order_by("index")
+            .values_list("chug__id", "game_id", "position", "chug__duration_ms")
+        ):
+            chugs[game_id, chug_position].append((duration_ms, chug_id))
+
+        stats = {
+            (user_id, season_number): cls(user_id=user_id, season_number=season_number)
+            for user_id in users.values_list("id", flat=True)
+            for season_number in season_numbers
+        }
+        fastest_chug_ms = {}
+
+        for (
+            user_id,
+            game_id,
+            gp_position,
+            gp_dnf,
+            game_dnf,
+            game_season_number,
+            start_datetime,
+            end_datetime,
+        ) in gameplayers.order_by(
+            Coalesce("game__end_datetime", "game__start_datetime"), "game_id"
+        ).values_list(
+            "user_id",
+            "game_id",
+            "position",
+            "dnf",
+            "game__dnf",
+            "game__season_number",
+            "game__start_datetime",
+            "game__end_datetime",
+        ):
+            game_season_numbers = cls.get_game_season_numbers(game_season_number)
+            for season_number in game_season_numbers & season_numbers:
+                key = (user_id, season_number)
+                ps = stats[key]
+
+                if game_dnf:
+                    if gp_dnf:
+                        ps.total_games_with_player_and_game_dnf += 1
+                    else:
+                        ps.total_games_with_game_dnf += 1
+                    continue
+
+                if gp_dnf:
+                    ps.total_games_with_player_dnf += 1
+                    continue
+
+                ps.total_games += 1
+                if start_datetime and end_datetime:
+                    ps.total_time_played_seconds += (
+                        end_datetime - start_datetime
+                    ).total_seconds()
+
+                result = results.get((game_id, gp_position), {})
+                game_sips = result.get("sips") or 0
+                ps.total_sips += game_sips
+                ps.total_chugs += result.get("chugs") or 0
+                ps.total_chug_time_ms += result.get("chug_time_ms") or 0
+
+                for duration_ms, chug_id in chugs[game_id, gp_position]:
+                    ps.total_timed_chugs += 1
+                    ps.add_record_candidate("fastest_chug", duration_ms, chug_id)
+                    if key not in fastest_chug_ms or duration_ms < fastest_chug_ms[key]:
+                        fastest_chug_ms[key] = duration_ms
+                        ps.fastest_chug_id = chug_id
+
+                ps.add_record_candidate("best_game", game_sips, game_id)
+                ps.add_record_candidate("worst_game", game_sips, game_id)
+
+                if ps.best_game_id is None or game_sips > ps.best_game_sips:
+                    ps.best_game_id = game_id
+                    ps.best_game_sips = game_sips
+
+                if ps.worst_game_id is None or game_sips < ps.worst_game_sips:
+                    ps.worst_game_id = game_id
+                    ps.worst_game_sips = game_sips
+
+        for ps in stats.values():
+            ps.update_average_chug_time()
+
+        return stats
 
     def recalculate(self):
         for f in self._meta.fields:
             if f.default != models.fields.NOT_PROVIDED:
-                setattr(self, f.name, f.default)
+                setattr(self, f.name, f.get_default())
             elif f.null:
                 setattr(self, f.name, None)
 
@@ -241,66 +1052,153 @@ class PlayerStat(models.Model):
         if not game.official:
             return
 
-        gp = game.gameplayer_set.get(user=self.user)
+        snapshot = GameSnapshot(game)
+        gp = next(gp for gp in snapshot.gameplayers if gp.user_id == self.user_id)
+        self.add_game_stats(snapshot, gp)
+        self.save()
+
+    def add_game_stats(self, snapshot, gp):
+        game = snapshot.game
         if game.dnf:
             if gp.dnf:
                 self.total_games_with_player_and_game_dnf += 1
             else:
                 self.total_games_with_game_dnf += 1
-            self.save()
             return
 
         if gp.dnf:
             self.total_games_with_player_dnf += 1
-            self.save()
             return
 
         self.total_games += 1
 
-        player_index = gp.position
-        duration = game.get_duration()
-        if duration:
-            self.total_time_played_seconds += duration.total_seconds()
-
-        if self.average_chug_time_seconds:
-            total_chug_time = self.total_chugs * self.average_chug_time_seconds
-        else:
-            total_chug_time = 0
-        game_sips = 0
-        for i, c in enumerate(game.ordered_cards()):
-            if i % game.players.count() == player_index:
-                game_sips += c.value
-                if hasattr(c, "chug"):
-                    self.total_chugs += 1
-                    chug_time = c.chug.duration
-                    if chug_time:
-                        total_chug_time += chug_time.total_seconds()
-                        if (
-                            not self.fastest_chug
-                            or chug_time < self.fastest_chug.duration
-                        ):
-                            self.fastest_chug = c.chug
-
+        if snapshot.duration:
+            self.total_time_played_seconds += snapshot.duration.total_seconds()
+
+        for chug in snapshot.chugs[gp.position]:
+            self.total_chugs += 1
+            if chug.duration_ms:
+                self.total_timed_chugs += 1
+                self.total_chug_time_ms += chug.duration_ms
+                self.add_record_candidate("fastest_chug", chug.duration_ms, chug.id)
+                if (
+                    not self.fastest_chug
+                    or chug.duration_ms < self.fastest_chug.duration_ms
+                ):
+                    self.fastest_chug = chug
+
+        game_sips = snapshot.sips[gp.position]
         self.total_sips += game_sips
 
-        if not self.best_game or game_sips > self.best_game_sips:
+        self.add_record_candidate("best_game", game_sips, game.id)
+        self.add_record_candidate("worst_game", game_sips, game.id)
+
+        if self.best_game_id is None or game_sips > self.best_game_sips:
             self.best_game = game
             self.best_game_sips = game_sips
 
-        if not self.worst_game or game_sips < self.worst_game_sips:
+        if self.worst_game_id is None or game_sips < self.worst_game_sips:
             self.worst_game = game
             self.worst_game_sips = game_sips
 
-        if self.total_chugs > 0:
-            self.average_chug_time_seconds = total_chug_time / self.total_chugs
+        self.update_average_chug_time()
 
-        self.save()
+    def remove_game_stats(self, snapshot, gp):
+        """
+        Undoes add_game_stats. Returns False if a record of the game can't be
+        replaced from the candidates, in which case the stats must be recalculated.
+        """
+        game = snapshot.game
+        if game.dnf:
+            if gp.dnf:
+                self.total_games_with_player_and_game_dnf -= 1
+            else:
+                self.total_games_with_game_dnf -= 1
+            return True
+
+        if gp.dnf:
+            self.total_games_with_player_dnf -= 1
+            return True
+
+        self.total_games -= 1
+
+        if snapshot.duration:
+            self.total_time_played_seconds -= snapshot.duration.total_seconds()
+
+        chug_ids = set()
+        for chug in snapshot.chugs[gp.position]:
+            self.total_chugs -= 1
+            if chug.duration_ms:
+                self.total_timed_chugs -= 1
+                self.total_chug_time_ms -= chug.duration_ms
+                chug_ids.add(chug.id)
+
+        self.total_sips -= snapshot.sips[gp.position]
+        self.update_average_chug_time()
+
+        return all(
+            [
+                self.remove_record_candidates("best_game", {game.id}),
+                self.remove_record_candidates("worst_game", {game.id}),
+                self.remove_record_candidates("fastest_chug", chug_ids),
+            ]
+        )
+
+    def add_record_candidate(self, record, value, obj_id):
+        """
+        Must be called in the order the values were added,
+        after counting the new value.
+        """
+        _, count_field, higher_is_better = self.RECORDS[record]
+        candidates = self.record_candidates.setdefault(record, [])
+
+        # Ties go to the earliest
+        i = 0
+        while i < len(candidates) and (
+            candidates[i][0] >= value if higher_is_better else candidates[i][0] <= value
+        ):
+            i += 1
+
+        # A value after the last candidate can only be placed if no value was dropped
+        if i < len(candidates) or len(candidates) == getattr(self, count_field) - 1:
+            candidates.insert(i, [value, obj_id])
+            del candidates[self.RECORD_CANDIDATES :]
+
+    def remove_record_candidates(self, record, obj_ids):
+        value_field, count_field, _ = self.RECORDS[record]
+        candidates = [
+            c for c in self.record_candidates.pop(record, []) if c[1] not in obj_ids
+        ]
+        if candidates:
+            self.record_candidates[record] = candidates
+
+        if getattr(self, f"{record}_id") not in obj_ids:
+            return True
+
+        if candidates:
+            value, obj_id = candidates[0]
+        elif getattr(self, count_field) == 0:
+            value, obj_id = None, None
+        else:
+            return False
+
+        setattr(self, f"{record}_id", obj_id)
+        if value_field:
+            setattr(self, value_field, value)
+        return True
+
+    def update_average_chug_time(self):
+        # Chugs without a time count as 0 seconds
+        if self.total_chugs > 0:
+            self.average_chug_time_seconds = (
+                self.total_chug_time_ms / 1000 / self.total_chugs
+            )
+        else:
+            self.average_chug_time_seconds = None
 
     @property
     def season(self):
-        if self.season_number == 0:
-            return all_time_season
-        return Season(self.season_number)
+        return Season.from_number(self.season_number)
 
     @property
     def total_games_including_dnf(self):
@@ -350,6 +1248,293 @@ class PlayerStat(models.Model):
         return datetime.timedelta(seconds=self.average_chug_time_seconds)
 
 
+class RankingEntry(models.Model):
+    """
+    The rank of a player in a ranking (see games.ranking) in a season,
+    kept up to date with the player stats.
+    The ranks of a ranking are unique and without gaps.
+    """
+
+    class Meta:
+        unique_together = [("season_number", "ranking_key", "user")]
+        indexes = [models.Index(fields=["season_number", "ranking_key", "rank"])]
+
+    season_number = models.PositiveIntegerField()
+    ranking_key = models.CharField(max_length=32)
+    rank = models.PositiveIntegerField()
+    user = models.ForeignKey("User", on_delete=models.CASCADE, related_name="+")
+    # Every ranking value is stored as a float, see Ranking.get_value
+    value = models.FloatField()
+    game = models.ForeignKey(
+        "Game", on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+
+    @classmethod
+    def update_rankings(cls, season_numbers, user_ids=None):
+        """
+        Updates the rankings of the given seasons.
+        If user_ids is given, only the entries of those users are moved,
+        see update_user_ranks.
+        """
+        from .ranking import RANKINGS, invalidate_ranked_facecards
+
+        current_season = Season.current_season()
+        current_season_changed = False
+        with transaction.atomic():
+            cls.lock_rankings(
+                (season_number, r.key)
+                for season_number in season_numbers
+                for r in RANKINGS
+            )
+            for season_number in season_numbers:
+                season = Season.from_number(season_number)
+                if user_ids is None:
+                    changed = [cls.update_ranking(season, r) for r in RANKINGS]
+                else:
+                    changed = [cls.update_user_ranks(season, RANKINGS, user_ids)]
+                if any(changed) and season == current_season:
+                    current_season_changed = True
+
+        # The face cards show the current season
+        if current_season_changed:
+            transaction.on_commit(invalidate_ranked_facecards)
+
+    @staticmethod
+    def lock_rankings(keys):
+        """
+        Makes concurrent updates of the rankings with the given
+        (season number, ranking key) wait until the end of the transaction,
+        as the ranks are shifted based on the ones read.
+        The locks are taken in order, so updates can't deadlock each other.
+        """
+        # SQLite only has a single writer at a time
+        if connection.vendor != "postgresql":
+            return
+
+        with connection.cursor() as cursor:
+            for season_number, ranking_key in sorted(set(keys)):
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext(%s))",
+                    [f"ranking:{season_number}:{ranking_key}"],
+                )
+
+    @classmethod
+    def update_user_ranks(cls, season, rankings, user_ids):
+        """
+        Moves the entries of the given users, whose value or game has changed,
+        to their new rank. Returns whether any entry was changed.
+        """
+        from .ranking import get_ranked_stats
+
+        keys = {k for r in rankings for k in [r.value_key, r.game_key] if k}
+        stats = {
+            s["user_id"]: s
+            for s in get_ranked_stats(season)
+            .filter(user_id__in=user_ids)
+            .values("user_id", *keys)
+        }
+        stored = {
+            (e.ranking_key, e.user_id): e
+            for e in cls.objects.filter(
+                season_number=season.number, user_id__in=user_ids
+            )
+        }
+
+        changed = False
+        for ranking in rankings:
+            for user_id in user_ids:
+                s = stats.get(user_id)
+                value = s and s[ranking.value_key]
+                game_id = (s and ranking.game_key and s[ranking.game_key]) or None
+                entry = stored.get((ranking.key, user_id))
+                if value is None:
+                    if entry:
+                        cls.remove_entry(entry)
+                        changed = True
+                elif not entry or (entry.value, entry.game_id) != (value, game_id):
+                    cls.move_entry(season, ranking, entry, user_id, value, game_id)
+                    changed = True
+        return changed
+
+    @classmethod
+    def move_entry(cls, season, ranking, entry, user_id, value, game_id):
+        """
+        Gives the user (with or without an entry) the rank of the value,
+        only shifting the ranks between the old and the new rank.
+        """
+        entries = cls.objects.filter(
+            season_number=season.number, ranking_key=ranking.key
+        )
+        others = entries.exclude(user_id=user_id)
+        # Must match Ranking.get_qs
+        lookup = "gt" if ranking.ordering.startswith("-") else "lt"
+        rank = (
+            others.filter(
+                Q(**{f"value__{lookup}": value}) | Q(value=value, user_id__lt=user_id)
+            ).count()
+            + 1
+        )
+
+        if not entry:
+            entries.filter(rank__gte=rank).update(rank=F("rank") + 1)
+            cls.objects.create(
+                season_number=season.number,
+                ranking_key=ranking.key,
+                rank=rank,
+                user_id=user_id,
+                value=value,
+                game_id=game_id,
+            )
+            return
+
+        # Moving the other users may have shifted it
+        entry.refresh_from_db(fields=["rank"])
+        if rank < entry.rank:
+            others.filter(rank__gte=rank, rank__lt=entry.rank).update(
+                rank=F("rank") + 1
+            )
+        elif rank > entry.rank:
+            others.filter(rank__gt=entry.rank, rank__lte=rank).update(
+                rank=F("rank") - 1
+            )
+        entry.rank = rank
+        entry.value = value
+        entry.game_id = game_id
+        entry.save(update_fields=["rank", "value", "game"])
+
+    @classmethod
+    def remove_entry(cls, entry):
+        entry.refresh_from_db(fields=["rank"])
+        entry.delete()
+        cls.close_rank_gap(entry.season_number, entry.ranking_key, entry.rank)
+
+    @classmethod
+    def close_rank_gap(cls, season_number, ranking_key, rank):
+        """
+        The ranking must be locked, see lock_rankings.
+        """
+        cls.objects.filter(
+            season_number=season_number, ranking_key=ranking_key, rank__gt=rank
+        ).update(rank=F("rank") - 1)
+
+    @classmethod
+    def update_ranking(cls, season, ranking):
+        """
+        Returns whether any entry was changed.
+        """
+        fields = ["user_id", ranking.value_key]
+        if ranking.game_key:
+            fields.append(ranking.game_key)
+
+        entries = cls.objects.filter(
+            season_number=season.number, ranking_key=ranking.key
+        )
+        existing = {e.user_id: e for e in entries}
+        changed = []
+        added = []
+        for rank, (user_id, value, *game) in enumerate(
+            ranking.get_qs(season).values_list(*fields), 1
+        ):
+            game_id = game[0] if game else None
+            e = existing.pop(user_id, None)
+            if not e:
+                added.append(
+                    cls(
+                        season_number=season.number,
+                        ranking_key=ranking.key,
+                        rank=rank,
+                        user_id=user_id,
+                        value=value,
+                        game_id=game_id,
+                    )
+                )
+            elif (e.rank, e.value, e.game_id) != (rank, value, game_id):
+                e.rank = rank
+                e.value = value
+                e.game_id = game_id
+                changed.append(e)
+
+        # The players no longer in the ranking
+        cls.objects.filter(id__in=[e.id for e in existing.values()]).delete()
+        cls.objects.bulk_update(changed, ["rank", "value", "game"], batch_size=1000)
+        cls.objects.bulk_create(added, batch_size=1000)
+        return bool(existing or changed or added)
+
+
+class StatsRecalculation(models.Model):
+    """
+    A run of recalculate_all_stats, split into partitions that can run in parallel.
+    Finished partitions are checkpoints, so an interrupted run can be resumed.
+    """
+
+    started = models.DateTimeField(default=timezone.now)
+    finished = models.DateTimeField(null=True, blank=True)
+    # The phase whose partitions have been sent to Celery workers
+    dispatched_phase = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Stats recalculation {self.started:%Y-%m-%d %H:%M}"
+
+    def get_current_phase(self):
+        partition = (
+            self.partitions.filter(finished__isnull=True).order_by("phase").first()
+        )
+        return partition.phase if partition else None
+
+    def get_progress(self):
+        return list(
+            self.partitions.order_by("phase", "kind")
+            .values("kind")
+            .annotate(
+                total=Count("id"),
+                done=Count("id", filter=Q(finished__isnull=False)),
+                items=Sum("items", default=0),
+                seconds=Sum("seconds", default=0),
+            )
+        )
+
+    def status_str(self):
+        elapsed = (self.finished or timezone.now()) - self.started
+        elapsed = datetime.timedelta(seconds=int(elapsed.total_seconds()))
+        status = "finished" if self.finished else "running"
+        lines = [f"{self} ({status}, {elapsed})"]
+        for p in self.get_progress():
+            # Throughput of the partitions themselves, as they might run in parallel
+            throughput = p["items"] / p["seconds"] if p["seconds"] else 0
+            lines.append(
+                f"{p['kind']}: {p['done']}/{p['total']} partitions, "
+                f"{p['items']} items, {throughput:.1f} items/s"
+            )
+        return "\n".join(lines)
+
+
+class StatsRecalculationPartition(models.Model):
+    class Meta:
+        unique_together = [("recalculation", "kind", "key")]
+        ordering = ("phase", "kind", "key")
+
+    # Partitions of a phase depend on every partition of the earlier phases
+    KINDS = {
+        "game_player_stats": 0,
+        "player_stats": 0,
+        "stats_aggregate": 1,
+    }
+
+    recalculation = models.ForeignKey(
+        StatsRecalculation, on_delete=models.CASCADE, related_name="partitions"
+    )
+    phase = models.PositiveSmallIntegerField()
+    kind = models.CharField(max_length=32)
+    # The season number, or the first game id of a range of games
+    key = models.PositiveIntegerField()
+    finished = models.DateTimeField(null=True, blank=True)
+    items = models.PositiveIntegerField(default=0)
+    seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.kind} {self.key}"
+
+
 class User(AbstractUser):
     IMAGE_SIZE = (156, 262)
 
@@ -364,7 +1549,7 @@ class User(AbstractUser):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        super().save()
+        super().save(*args, **kwargs)
 
         save_force_image_name(self, "image", get_user_image_name)
 
@@ -471,6 +1656,12 @@ class Season:
 
         return Season(season_number)
 
+    @classmethod
+    def from_number(cls, number):
+        if number == all_time_season.number:
+            return all_time_season
+        return Season(number)
+
     @classmethod
     def current_season(cls):
         return cls.season_from_date(datetime.date.today())
@@ -504,6 +1695,16 @@ class _AllTimeSeason(Season):
 all_time_season = _AllTimeSeason()
 
 
+def get_all_seasons():
+    return [all_time_season] + list(
+        map(Season, range(Season.current_season().number, 0, -1))
+    )
+
+
+def get_all_player_counts():
+    return [None] + list(range(2, 6 + 1))
+
+
 class Game(models.Model):
     TOTAL_ROUNDS = 13
     STANDARD_SIPS_PER_BEER = 14
@@ -513,6 +1714,7 @@ class Game(models.Model):
             "dnf",
             "-end_datetime",
         )
+        indexes = [models.Index(fields=["season_number", "player_count"])]
 
     """
     Game data updates:
@@ -537,10 +1739,34 @@ class Game(models.Model):
     image = models.ImageField(upload_to=get_game_image_name, blank=True, null=True)
     facebook_post_id = models.CharField(max_length=64, null=True, blank=True)
     shuffle_indices = models.JSONField(null=True, blank=True)
+    # The cards and shuffle indices of an ended game, see games.packed_cards
+    packed_cards = models.BinaryField(null=True, blank=True)
+    # Kept up to date when the game is saved, see filter_season and filter_player_count
+    season_number = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    player_count = models.PositiveSmallIntegerField(default=0, editable=False)
 
     def save(self, *args, **kwargs):
+        self.season_number = self.calculate_season_number()
+        if self.id:
+            self.player_count = self.gameplayer_set.count()
         super().save()
         save_force_image_name(self, "image", get_game_image_name)
+        # The players or cards might have changed as well
+        self.reset_snapshot()
+
+    @cached_property
+    def snapshot(self):
+        """
+        The game with its players and cards loaded, reused until the game is saved
+        or reset_snapshot is called.
+        """
+        return GameSnapshot(self)
+
+    def reset_snapshot(self):
+        """
+        Must be called when the players or cards of the game are changed.
+        """
+        self.__dict__.pop("snapshot", None)
 
     @staticmethod
     def add_durations(qs):
@@ -550,6 +1776,17 @@ class Game(models.Model):
             )
         )
 
+    @staticmethod
+    def count_by_end_date(qs):
+        # Dates are in the local timezone
+        return dict(
+            qs.filter(end_datetime__isnull=False)
+            .annotate(date=TruncDate("end_datetime"))
+            .order_by()
+            .values_list("date")
+            .annotate(Count("id"))
+        )
+
     def __str__(self):
         return f"{self.datetime}: {self.players_str()}"
 
@@ -590,28 +1827,29 @@ class Game(models.Model):
         return self.datetime.date()
 
     def get_last_activity_time(self):
-        if self.end_datetime:
-            return self.end_datetime
-
-        cards = self.ordered_cards()
-        if len(cards) > 0:
-            return cards.last().drawn_datetime
-
-        return self.start_datetime
+        return self.snapshot.get_last_activity_time()
 
     def all_cards_done(self) -> bool:
-        cards = self.ordered_cards()
-        if len(cards) < self.get_total_card_count():
-            return False
+        return self.snapshot.all_cards_done()
+
+    def calculate_season_number(self):
+        # The season of an ended game is the one it ended in,
+        # or for dnf games the one it started in.
+        # Seasons start at midnight UTC.
+        if self.end_datetime:
+            dt = self.end_datetime
+        elif self.dnf and self.start_datetime:
+            dt = self.start_datetime
+        else:
+            return None
 
-        last_card = cards.last()
-        return last_card.finish_start_delta_ms is not None
+        return Season.season_from_date(dt.astimezone(datetime.timezone.utc)).number
 
     def get_season(self):
-        if not self.has_ended:
+        if self.season_number is None:
             return None
 
-        return Season.season_from_date(self.get_last_activity_time())
+        return Season(self.season_number)
 
     def season_number_str(self):
         season = self.get_season()
@@ -620,13 +1858,7 @@ class Game(models.Model):
         return str(season.number)
 
     def get_duration(self):
-        if self.dnf:
-            return self.get_last_activity_time() - self.start_datetime
-
-        if not (self.start_datetime and self.end_datetime):
-            return None
-
-        return self.end_datetime - self.start_datetime
+        return self.snapshot.get_duration()
 
     def duration_str(self):
         if not self.start_datetime:
@@ -666,86 +1898,74 @@ class Game(models.Model):
         return self.cards.order_by("index")
 
     def cards_by_round(self):
-        n = self.players.count()
-        cards = self.ordered_cards()
-        for i in range(self.TOTAL_ROUNDS):
-            round_cards = cards[i * n : (i + 1) * n]
-            yield list(round_cards) + [None] * (n - len(round_cards))
+        return self.snapshot.cards_by_round()
 
     def ordered_chugs(self):
         return (c.chug for c in self.cards.filter(chug__isnull=False))
 
     def get_total_card_count(self):
-        return self.players.count() * len(Card.VALUES)
+        return self.snapshot.get_total_card_count()
 
     def get_turn_durations(self):
-        prev_finish_start_delta_ms = 0
-        for c in self.ordered_cards():
-            if c.finish_start_delta_ms is None:
-                return
-
-            if prev_finish_start_delta_ms is not None:
-                yield c.finish_start_delta_ms - prev_finish_start_delta_ms
-
-            prev_finish_start_delta_ms = c.finish_start_delta_ms
+        return self.snapshot.get_turn_durations()
 
     def get_player_stats(self):
-        # Note that toal_drawn and total_done,
-        # can differ for one player, if the game hasn't ended.
-        def div_or_none(a, b):
-            if a is None or not b:
-                return None
-            return a / b
+        return self.snapshot.get_player_stats()
 
-        n = self.players.count()
-        total_sips = [0] * n
-        total_drawn = [0] * n
-        last_sip = None
-        for i, c in enumerate(self.ordered_cards()):
-            total_sips[i % n] += c.value
-            total_drawn[i % n] += 1
-            last_sip = (i % n, c.value)
-
-        first_card = self.ordered_cards().first()
-        if first_card and first_card.start_delta_ms:
-            total_times = [0] * n
-            total_done = [0] * n
-            for i, dt in enumerate(self.get_turn_durations()):
-                total_times[i % n] += dt
-                total_done[i % n] += 1
-        else:
-            total_times = [None] * n
-            total_done = [None] * n
+    def get_packed_cards(self):
+        """
+        The card sequence stored when the game ended, or None if it isn't stored.
+        """
+        if self.packed_cards is None:
+            return None
 
-        ordered_gameplayers = self.ordered_gameplayers()
-        for i in range(n):
-            full_beers = total_sips[i] // self.sips_per_beer
-            extra_sips = total_sips[i] % self.sips_per_beer
+        return PackedCards(self.packed_cards)
 
-            if not self.start_datetime:
-                time_per_sip = None
-            elif last_sip and last_sip[0] == i and not self.is_completed:
-                time_per_sip = div_or_none(
-                    total_times[i], (total_sips[i] - last_sip[1])
+    def update_packed_cards(self, sign=1, snapshot=None):
+        if sign < 0:
+            self.packed_cards = None
+        else:
+            snapshot = snapshot or GameSnapshot(self)
+            cards = []
+            for c in snapshot.cards:
+                chug = getattr(c, "chug", None)
+                cards.append(
+                    (
+                        c.value,
+                        c.suit,
+                        c.start_delta_ms,
+                        chug and chug.start_start_delta_ms,
+                        chug and chug.duration_ms,
+                    )
                 )
-            else:
-                time_per_sip = div_or_none(total_times[i], total_sips[i])
+            self.packed_cards = pack_cards(cards, self.shuffle_indices)
+        Game.objects.filter(id=self.id).update(packed_cards=self.packed_cards)
 
-            gp = ordered_gameplayers[i]
+    @classmethod
+    def recalculate_packed_cards(cls, games):
+        games = list(
+            games.filter(Q(end_datetime__isnull=False) | Q(dnf=True)).only(
+                "id", "shuffle_indices"
+            )
+        )
+        cards = defaultdict(list)
+        for game_id, *card in (
+            Card.objects.filter(game__in=games)
+            .order_by("game_id", "index")
+            .values_list(
+                "game_id",
+                "value",
+                "suit",
+                "start_delta_ms",
+                "chug__start_start_delta_ms",
+                "chug__duration_ms",
+            )
+        ):
+            cards[game_id].append(card)
 
-            yield {
-                "id": gp.user.id,
-                "username": gp.user.username,
-                "dnf": gp.dnf,
-                "dnf_datetime": gp.dnf_datetime,
-                "total_sips": total_sips[i],
-                "sips_per_turn": div_or_none(total_sips[i], total_drawn[i]),
-                "full_beers": full_beers,
-                "extra_sips": extra_sips,
-                "total_time": total_times[i],
-                "time_per_turn": div_or_none(total_times[i], total_done[i]),
-                "time_per_sip": time_per_sip,
-            }
+        for game in games:
+            game.packed_cards = pack_cards(cards[game.id], game.shuffle_indices)
+        cls.objects.bulk_update(games, ["packed_cards"], batch_size=100)
 
     def get_shuffled_deck(self):
         if not self.shuffle_indices:
@@ -783,6 +2003,71 @@ class GamePlayer(models.Model):
     dnf = models.BooleanField(default=False)
     dnf_datetime = models.DateTimeField(blank=True, null=True)
 
+    # Results stored when the game is completed, see Game.get_player_stats
+    total_sips = models.PositiveIntegerField(blank=True, null=True)
+    total_cards = models.PositiveSmallIntegerField(blank=True, null=True)
+    total_time_ms = models.IntegerField(blank=True, null=True)
+    total_timed_turns = models.PositiveSmallIntegerField(blank=True, null=True)
+
+    RESULT_FIELDS = ["total_sips", "total_cards", "total_time_ms", "total_timed_turns"]
+
+    @classmethod
+    def update_on_game_finished(cls, game, sign=1, snapshot=None):
+        if not game.is_completed:
+            return
+
+        if sign < 0:
+            cls.objects.filter(game=game).update(**dict.fromkeys(cls.RESULT_FIELDS))
+            return
+
+        snapshot = snapshot or GameSnapshot(game)
+        for gp in snapshot.gameplayers:
+            gp.total_sips = snapshot.sips[gp.position]
+            gp.total_cards = snapshot.cards_drawn[gp.position]
+            gp.total_time_ms = snapshot.turn_time_ms[gp.position]
+            gp.total_timed_turns = snapshot.timed_turns[gp.position]
+        cls.objects.bulk_update(snapshot.gameplayers, cls.RESULT_FIELDS)
+
+    @classmethod
+    def recalculate_games(cls, games):
+        for game in games.filter(end_datetime__isnull=False):
+            cls.update_on_game_finished(game)
+
+
+@receiver(pre_delete, sender=User)
+def on_user_deleting(*, instance, **_kwargs):
+    # The entries are deleted along with the user,
+    # their ranks must not be shifted until the gaps are closed
+    entries = RankingEntry.objects.filter(user=instance)
+    RankingEntry.lock_rankings(entries.values_list("season_number", "ranking_key"))
+    instance.deleted_ranks = list(
+        entries.values_list("season_number", "ranking_key", "rank")
+    )
+
+
+@receiver(post_delete, sender=User)
+def on_user_deleted(*, instance, **_kwargs):
+    # Keep the ranks without gaps, see RankingEntry
+    for season_number, ranking_key, rank in instance.deleted_ranks:
+        RankingEntry.close_rank_gap(season_number, ranking_key, rank)
+
+
+@receiver([post_save, post_delete], sender=User)
+def on_user_changed(*, update_fields=None, **_kwargs):
+    from .ranking import invalidate_ranked_facecards
+
+    # The face cards show the username and image,
+    # but logging in only saves last_login
+    if update_fields is None or set(update_fields) - {"last_login"}:
+        transaction.on_commit(invalidate_ranked_facecards)
+
+
+@receiver([post_save, post_delete], sender=GamePlayer)
+def on_gameplayer_changed(*, instance, **_kwargs):
+    Game.objects.filter(id=instance.game_id).update(
+        player_count=GamePlayer.objects.filter(game_id=instance.game_id).count()
+    )
+
 
 class Card(models.Model):
     class Meta:
@@ -0,0 +1,85 @@
+"""
+Compact encoding of the card sequence of a finished game,
+so it can be read back from a single column without loading any card rows.
+
+The encoding is a header followed by fixed-width little-endian arrays:
+- header: format version, card count and shuffle index count (1 byte each)
+- card values and suits (1 byte per card, the suit as its ASCII code)
+- card start_delta_ms, chug start_start_delta_ms and chug duration_ms
+  (4 bytes per card, MISSING when there is no value or no chug)
+- shuffle indices (1 byte each)
+"""
+
+import struct
+
+VERSION = 1
+MISSING = 0xFFFFFFFF
+
+HEADER = struct.Struct("<BBB")
+
+
+class PackedCards:
+    """
+    The decoded arrays of an encoded card sequence, indexed like the cards.
+    """
+
+    __slots__ = [
+        "values",
+        "suits",
+        "start_delta_ms",
+        "chug_start_start_delta_ms",
+        "chug_duration_ms",
+        "shuffle_indices",
+    ]
+
+    def __init__(self, data):
+        version, card_count, shuffle_count = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"Unknown packed cards version: {version}")
+
+        offset = HEADER.size
+
+        def read(code, count):
+            nonlocal offset
+            fmt = f"<{count}{code}"
+            values = struct.unpack_from(fmt, data, offset)
+            offset += struct.calcsize(fmt)
+            return values
+
+        def read_times():
+            return tuple(None if v == MISSING else v for v in read("I", card_count))
+
+        self.values = read("B", card_count)
+        self.suits = bytes(read("B", card_count)).decode("ascii")
+        self.start_delta_ms = read_times()
+        self.chug_start_start_delta_ms = read_times()
+        self.chug_duration_ms = read_times()
+        self.shuffle_indices = list(read("B", shuffle_count))
+
+    def __len__(self):
+        return len(self.values)
+
+
+def pack_cards(cards, shuffle_indices=None):
+    """
+    cards are (value, suit, start_delta_ms, chug_start_start_delta_ms,
+    chug_duration_ms) tuples in the order they were drawn.
+    """
+    shuffle_indices = shuffle_indices or []
+    cards = list(cards)
+    n = len(cards)
+
+    def times(i):
+        return [MISSING if c[i] is None else c[i] for c in cards]
+
+    return b"".join(
+        [
+            HEADER.pack(VERSION, n, len(shuffle_indices)),
+            struct.pack(f"<{n}B", *(c[0] for c in cards)),
+            "".join(c[1] for c in cards).encode("ascii"),
+            struct.pack(f"<{n}I", *times(2)),
+            struct.pack(f"<{n}I", *times(3)),
+            struct.pack(f"<{n}I", *times(4)),
+            struct.pack(f"<{len(shuffle_indices)}B", *shuffle_indices),
+        ]
+    )
@@ -1,4 +1,10 @@
-from .models import PlayerStat
+import hashlib
+import json
+import uuid
+
+from django.utils.functional import cached_property
+
+from .models import Card, PlayerStat, RankingEntry, Season
 from .utils import (
     add_thousand_seperators,
     format_chug_duration,
@@ -7,21 +13,21 @@ from .utils import (
 )
 
 
-def django_getattr(obj, key):
-    keys = key.split("__")
-    for k in keys:
-        obj = getattr(obj, k)
-    return obj
-
-
 class Ranking:
     def __init__(
-        self, name, ordering, game_key=None, formatter=add_thousand_seperators
+        self,
+        name,
+        ordering,
+        game_key=None,
+        formatter=add_thousand_seperators,
+        select_related=("user",),
     ):
         self.name = name
         self.ordering = ordering
         self.game_key = game_key
         self.formatter = formatter
+        # What is shown with each entry, the game is linked by its id
+        self.select_related = select_related
 
     @property
     def key(self):
@@ -31,31 +37,40 @@ class Ranking:
     def value_key(self):
         return self.ordering.lstrip("-")
 
-    def get_value(self, o):
-        return self.formatter(django_getattr(o, self.value_key))
+    @cached_property
+    def value_field(self):
+        model = PlayerStat
+        *relations, name = self.value_key.split("__")
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
 
-    def get_game(self, o):
-        if self.game_key:
-            return django_getattr(o, self.game_key)
-        return None
+    def get_value(self, entry):
+        # The entry stores the value as a float
+        return self.formatter(self.value_field.to_python(entry.value))
 
     def get_qs(self, season):
-        return PlayerStat.objects.filter(
-            **{
-                "season_number": season.number,
-                "total_games__gt": 0,
-                f"{self.value_key}__isnull": False,
-            }
-        ).order_by(self.ordering, "id")
+        """
+        The ranked player stats, which the ranking entries are updated from.
+        """
+        return (
+            get_ranked_stats(season)
+            .filter(**{f"{self.value_key}__isnull": False})
+            # Ties are broken like in RankingEntry.move_entry
+            .order_by(self.ordering, "user_id")
+        )
 
-    def get_rank(self, user, season):
-        stats = user.stats_for_season(season)
+    def get_entries(self, season):
+        entries = RankingEntry.objects.filter(
+            season_number=season.number, ranking_key=self.key
+        ).order_by("rank")
+        if self.select_related:
+            # Without any fields it would follow every foreign key
+            entries = entries.select_related(*self.select_related)
+        return entries
 
-        try:
-            user_index = list(self.get_qs(season)).index(stats)
-            return user_index + 1
-        except ValueError:
-            return None
+    def get_rank(self, user, season):
+        return get_ranks(user, season, [self])[self.key]
 
 
 RANKINGS = [
@@ -77,7 +92,91 @@ RANKINGS = [
 ]
 
 
+def get_ranked_stats(season):
+    return PlayerStat.objects.filter(season_number=season.number, total_games__gt=0)
+
+
+def get_ranks(user, season, rankings=RANKINGS):
+    """
+    Returns the rank of the user in each of the rankings keyed by ranking key,
+    or None if the user isn't in a ranking.
+    """
+    ranks = {ranking.key: None for ranking in rankings}
+    ranks.update(
+        RankingEntry.objects.filter(
+            season_number=season.number, user=user, ranking_key__in=ranks
+        ).values_list("ranking_key", "rank")
+    )
+    return ranks
+
+
 def get_ranking_from_key(key):
     for ranking in RANKINGS:
         if key == ranking.key:
             return ranking
+
+
+# Replaced whenever the face cards might change, see invalidate_ranked_facecards
+FACECARDS_VERSION_KEY = "ranked_facecards_version"
+
+
+def get_facecards(season):
+    """
+    The top players with an image of the first rankings,
+    one ranking per suit, keyed by "<suit>-<value>".
+    """
+    facecards = {}
+    for ranking, (suit, _) in zip(RANKINGS, Card.SUITS):
+        entries = ranking.get_entries(season)
+
+        for entry, value in zip(
+            entries.exclude(user__image="")[: len(Card.FACE_CARD_VALUES)],
+            Card.FACE_CARD_VALUES,
+        ):
+            user = entry.user
+            facecards[f"{suit}-{value}"] = {
+                "user_id": user.id,
+                "user_username": user.username,
+                "user_image": user.image_url(),
+                "ranking_name": ranking.name,
+                "ranking_value": ranking.get_value(entry),
+            }
+
+    return facecards
+
+
+def get_ranked_facecards():
+    """
+    Returns an ETag and the face cards of the current season.
+
+    They are built once per version and stored in the stats cache,
+    as every game client requests them when it starts.
+    """
+    from web.stats import get_stats_cache
+
+    cache = get_stats_cache()
+    # The version must be read before building the face cards, such that they
+    # are at least as new as the version they are stored as
+    cache.add(FACECARDS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    version = cache.get(FACECARDS_VERSION_KEY)
+    season = Season.current_season()
+    key = f"ranked_facecards:{season.number}:{version}"
+
+    entry = cache.get(key)
+    if entry is None:
+        facecards = get_facecards(season)
+        digest = hashlib.sha256(
+            json.dumps(facecards, sort_keys=True).encode()
+        ).hexdigest()
+        # The ETag only depends on the data,
+        # so clients keep their copy when a rebuild didn't change anything
+        entry = (f'"{digest}"', facecards)
+        cache.set(key, entry)
+
+    return entry
+
+
+def invalidate_ranked_facecards():
+    from web.stats import get_stats_cache
+
+    get_stats_cache().set(FACECARDS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
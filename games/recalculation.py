@@ -0,0 +1,174 @@
+"""
+Recalculation of every stat, split into partitions that run in a process pool
+or on Celery workers. Each partition is committed together with its checkpoint,
+so an interrupted recalculation resumes with the unfinished partitions.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from tqdm import tqdm
+
+from .models import (
+    Game,
+    GamePlayer,
+    GamePlayerStat,
+    PlayerStat,
+    Season,
+    StatsAggregate,
+    StatsRecalculation,
+    StatsRecalculationPartition,
+    User,
+    get_all_player_counts,
+)
+
+# Number of consecutive game ids in a partition of game player stats
+GAME_PARTITION_SIZE = 500
+
+
+def get_partition_keys(kind):
+    if kind == "game_player_stats":
+        ids = Game.objects.aggregate(first=Min("id"), last=Max("id"))
+        if ids["first"] is None:
+            return []
+        first = ids["first"] - ids["first"] % GAME_PARTITION_SIZE
+        return list(range(first, ids["last"] + 1, GAME_PARTITION_SIZE))
+
+    return list(range(Season.current_season().number + 1))
+
+
+def recalculate_partition(kind, key):
+    """
+    Returns the number of items (games, player stats or aggregates) recalculated.
+    """
+    if kind == "game_player_stats":
+        games = Game.objects.filter(id__gte=key, id__lt=key + GAME_PARTITION_SIZE)
+        Game.recalculate_packed_cards(games)
+        GamePlayerStat.recalculate_games(games)
+        GamePlayer.recalculate_games(games)
+        return games.count()
+
+    season = Season.from_number(key)
+    if kind == "player_stats":
+        PlayerStat.recalculate_season(season)
+        return User.objects.count()
+
+    if kind == "stats_aggregate":
+        StatsAggregate.recalculate_season(season)
+        return len(get_all_player_counts())
+
+    raise ValueError(f"Unknown partition kind: {kind}")
+
+
+def create_recalculation():
+    with transaction.atomic():
+        recalculation = StatsRecalculation.objects.create()
+        StatsRecalculationPartition.objects.bulk_create(
+            [
+                StatsRecalculationPartition(
+                    recalculation=recalculation, phase=phase, kind=kind, key=key
+                )
+                for kind, phase in StatsRecalculationPartition.KINDS.items()
+                for key in get_partition_keys(kind)
+            ]
+        )
+    return recalculation
+
+
+def get_or_create_recalculation(restart=False):
+    recalculation = (
+        StatsRecalculation.objects.filter(finished__isnull=True)
+        .order_by("-started")
+        .first()
+    )
+    if recalculation and not restart:
+        return recalculation
+    return create_recalculation()
+
+
+def run_partition(partition_id):
+    with transaction.atomic():
+        # Locked, such that a partition dispatched twice only runs once
+        partition = StatsRecalculationPartition.objects.select_for_update().get(
+            id=partition_id
+        )
+        if not partition.finished:
+            start = time.perf_counter()
+            partition.items = recalculate_partition(partition.kind, partition.key)
+            partition.seconds = time.perf_counter() - start
+            partition.finished = timezone.now()
+            partition.save()
+    return partition
+
+
+def get_unfinished_partition_ids(recalculation, phase):
+    return list(
+        recalculation.partitions.filter(phase=phase, finished__isnull=True).values_list(
+            "id", flat=True
+        )
+    )
+
+
+def finish_if_done(recalculation):
+    if recalculation.get_current_phase() is None and not recalculation.finished:
+        recalculation.finished = timezone.now()
+        recalculation.save()
+
+
+def run_locally(recalculation, processes=1):
+    while (phase := recalculation.get_current_phase()) is not None:
+        partition_ids = get_unfinished_partition_ids(recalculation, phase)
+        if processes == 1:
+            for partition_id in tqdm(partition_ids):
+                run_partition(partition_id)
+        else:
+            # Every process must open its own database connection
+            connections.close_all()
+            with ProcessPoolExecutor(processes, initializer=django.setup) as pool:
+                for _ in tqdm(
+                    pool.map(run_partition, partition_ids), total=len(partition_ids)
+                ):
+                    pass
+
+    finish_if_done(recalculation)
+
+
+def dispatch(recalculation_id):
+    """
+    Sends the partitions of the current phase to Celery workers,
+    once the partitions of the previous phase are done.
+    """
+    from .tasks import run_stats_recalculation_partition
+
+    with transaction.atomic():
+        recalculation = StatsRecalculation.objects.select_for_update().get(
+            id=recalculation_id
+        )
+        phase = recalculation.get_current_phase()
+        if phase is None:
+            finish_if_done(recalculation)
+            return
+
+        if recalculation.dispatched_phase == phase:
+            return
+
+        recalculation.dispatched_phase = phase
+        recalculation.save()
+        partition_ids = get_unfinished_partition_ids(recalculation, phase)
+
+        def send_tasks():
+            for partition_id in partition_ids:
+                run_stats_recalculation_partition.delay(partition_id)
+
+        transaction.on_commit(send_tasks)
+
+
+def run_on_workers(recalculation):
+    # Partitions sent before an interruption might have been lost,
+    # so send the current phase again. Finished partitions are skipped.
+    StatsRecalculation.objects.filter(id=recalculation.id).update(dispatched_phase=None)
+    dispatch(recalculation.id)
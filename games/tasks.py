@@ -9,8 +9,9 @@ from webpush import send_group_notification
 
 from academy.utils import get_absolute_url
 
+from . import recalculation
 from .facebook import post_game_to_page, update_game_post
-from .models import Game, recalculate_all_stats
+from .models import Game, update_stats_on_game_finished
 
 
 @shared_task
@@ -24,6 +25,7 @@ def mark_dnf_games():
         if timezone.now() - game.get_last_activity_time() >= DNF_THRESHOLD:
             game.dnf = True
             game.save()
+            update_stats_on_game_finished(game)
 
 
 @shared_task
@@ -40,6 +42,7 @@ def mark_finished_games():
                 milliseconds=last_card.finish_start_delta_ms
             )
             game.save()
+            update_stats_on_game_finished(game)
 
 
 @shared_task
@@ -53,7 +56,13 @@ def delete_empty_games():
 
 @shared_task
 def recalculate_stats():
-    recalculate_all_stats()
+    recalculation.run_on_workers(recalculation.get_or_create_recalculation())
+
+
+@shared_task
+def run_stats_recalculation_partition(partition_id):
+    partition = recalculation.run_partition(partition_id)
+    recalculation.dispatch(partition.recalculation_id)
 
 
 @shared_task
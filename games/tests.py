@@ -9,10 +9,18 @@ from django.test import TransactionTestCase, skipUnlessDBFeature
 from django.utils import timezone
 from rest_framework.test import APIClient
 
-from games.models import Card, Chug, Game, OneTimePassword, User
+from games.models import (
+    Card,
+    Chug,
+    Game,
+    OneTimePassword,
+    User,
+    get_user_image_name,
+)
 from games.serializers import GameSerializer
 from games.utils import get_milliseconds
 from games.views import update_game
+from web import stats
 
 
 class ApiTest(TransactionTestCase):
@@ -198,6 +206,73 @@ class ApiTest(TransactionTestCase):
                     - card_data["chug_start_start_delta_ms"],
                 )
 
+    def test_packed_cards(self):
+        self.set_token(self.game_token)
+        self.update_game(self.get_game_data(5))
+        game = Game.objects.get(id=self.game_id)
+        self.assertIsNone(game.get_packed_cards())
+
+        self.update_game(self.final_game_data)
+        game = Game.objects.get(id=self.game_id)
+        packed = game.get_packed_cards()
+        self.assertEqual(len(packed), game.cards.count())
+        self.assertEqual(packed.shuffle_indices, self.SHUFFLE_INDICES)
+        for i, card in enumerate(game.cards.all()):
+            chug = getattr(card, "chug", None)
+            self.assertEqual(
+                (
+                    packed.values[i],
+                    packed.suits[i],
+                    packed.start_delta_ms[i],
+                    packed.chug_start_start_delta_ms[i],
+                    packed.chug_duration_ms[i],
+                ),
+                (
+                    card.value,
+                    card.suit,
+                    card.start_delta_ms,
+                    chug and chug.start_start_delta_ms,
+                    chug and chug.duration_ms,
+                ),
+            )
+
+        stored = bytes(game.packed_cards)
+        Game.recalculate_packed_cards(Game.objects.all())
+        game.refresh_from_db()
+        self.assertEqual(bytes(game.packed_cards), stored)
+
+    def test_ranked_facecards(self):
+        stats.get_stats_cache().clear()
+        # Only players with an image are shown
+        for u in [self.u1, self.u2]:
+            User.objects.filter(id=u.id).update(image=get_user_image_name(u))
+
+        r = self.client.get("/api/ranked_cards/")
+        self.assert_ok(r)
+        self.assertEqual(r.data, {})
+        etag = r["ETag"]
+
+        with self.assertNumQueries(0):
+            r = self.client.get("/api/ranked_cards/", HTTP_IF_NONE_MATCH=etag)
+        self.assert_status(r, 304)
+
+        self.set_token(self.game_token)
+        self.update_game(self.final_game_data)
+        self.client.credentials()
+
+        r = self.client.get("/api/ranked_cards/", HTTP_IF_NONE_MATCH=etag)
+        self.assert_ok(r)
+        self.assertNotEqual(r["ETag"], etag)
+        self.assertEqual(
+            {card["user_id"] for card in r.data.values()}, {self.u1.id, self.u2.id}
+        )
+
+        self.u1.refresh_from_db()
+        self.u1.username = "Renamed"
+        self.u1.save()
+        r = self.client.get("/api/ranked_cards/")
+        self.assertIn("Renamed", {card["user_username"] for card in r.data.values()})
+
     def test_send_final(self):
         self.set_token(self.game_token)
         self.update_game(self.final_game_data)
@@ -2,13 +2,15 @@ from django.db import transaction
 from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from PIL import Image
 from rest_framework import serializers, viewsets
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import AuthenticationFailed, NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import (
@@ -18,6 +20,9 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 
+from web import stats
+from web.utils import PlayerCountChooser
+
 from .models import (
     Card,
     Chug,
@@ -27,9 +32,11 @@ from .models import (
     PlayerStat,
     Season,
     User,
+    all_time_season,
+    retract_stats_of_game,
     update_stats_on_game_finished,
 )
-from .ranking import RANKINGS
+from .ranking import get_ranked_facecards
 from .serializers import (
     CreateGameSerializer,
     GameSerializer,
@@ -106,7 +113,7 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = (CreateOrAuthenticated,)
 
 
-def update_game(game, data):
+def update_game(game, data, stats_retracted=False):
     def update_field(key):
         if key in data:
             setattr(game, key, data[key])
@@ -128,6 +135,9 @@ def update_game(game, data):
             )
 
     game_already_ended = game.has_ended
+    if game_already_ended and not stats_retracted:
+        # They are added again below with the new data
+        retract_stats_of_game(game)
 
     if game.players.count() == 0:
         for i, p_id in enumerate(data["player_ids"]):
@@ -164,6 +174,7 @@ def update_game(game, data):
     dnf_gps = game.gameplayer_set.filter(user_id__in=data["dnf_player_ids"])
     dnf_gps.filter(dnf=False).update(dnf=True, dnf_datetime=timezone.now())
     game.gameplayer_set.exclude(id__in=dnf_gps).update(dnf=False, dnf_datetime=None)
+    game.reset_snapshot()
 
     game.dnf = data["dnf"]
 
@@ -173,8 +184,9 @@ def update_game(game, data):
 
     game.save()
 
-    if game.has_ended and not game_already_ended:
-        update_facebook_post.delay(game.id)
+    if game.has_ended:
+        if not game_already_ended:
+            update_facebook_post.delay(game.id)
         update_stats_on_game_finished(game)
 
 
@@ -299,26 +311,16 @@ class RankedFacecardsView(viewsets.ViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
     def list(self, request):
-        season = Season.current_season()
-
-        facecards = {}
-        for ranking, (suit, _) in zip(RANKINGS, Card.SUITS):
-            qs = ranking.get_qs(season)
+        etag, facecards = get_ranked_facecards()
 
-            for ps, value in zip(
-                qs.exclude(user__image="")[: len(Card.FACE_CARD_VALUES)],
-                Card.FACE_CARD_VALUES,
-            ):
-                user = ps.user
-                facecards[f"{suit}-{value}"] = {
-                    "user_id": user.id,
-                    "user_username": user.username,
-                    "user_image": user.image_url(),
-                    "ranking_name": ranking.name,
-                    "ranking_value": ranking.get_value(ps),
-                }
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(facecards)
 
-        return Response(facecards)
+        response["ETag"] = etag
+        # The face cards change with the rankings, so always revalidate
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
 class PlayerStatViewSet(viewsets.ViewSet):
@@ -341,3 +343,33 @@ class InfoViewSet(viewsets.ViewSet):
                 "datetime": timezone.now(),
             }
         )
+
+
+class StatsSectionViewSet(viewsets.ViewSet):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    lookup_field = "section"
+    lookup_value_regex = "[a-z_]+"
+
+    def retrieve(self, request, season_number=None, section=None):
+        if section not in stats.SECTIONS or not (
+            int(season_number) == all_time_season.number
+            or Season.is_valid_season_number(season_number)
+        ):
+            raise NotFound
+
+        season = Season.from_number(int(season_number))
+        player_count = PlayerCountChooser(request).current
+        etag, modified, data = stats.get_section_data(season, player_count, section)
+
+        last_modified = int(modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = Response(data)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # The data changes whenever a game finishes, so always revalidate
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -1,24 +1,26 @@
 import datetime
-from collections import Counter
+from collections.abc import Mapping
 from typing import Any
 
 from django.utils import timezone
 
-from games.models import Season, all_time_season, filter_season
+from games.models import Game, Season, all_time_season, filter_season
 
 
 def games_heatmap_data(games, season: Season) -> dict[str, Any]:
+    return heatmap_data(Game.count_by_end_date(filter_season(games, season)), season)
+
+
+def heatmap_data(
+    games_played: Mapping[datetime.date, int], season: Season
+) -> dict[str, Any]:
     if season == all_time_season:
-        last_date = timezone.now().date()
+        last_date = timezone.localdate()
         first_date = last_date - datetime.timedelta(days=53 * 7 - 1)
     else:
-        last_date = season.end_datetime.date()
-        first_date = season.start_datetime.date()
-
-    games_played = Counter()
-    for g in filter_season(games, season):
-        if g.end_datetime:
-            games_played[g.end_datetime.date()] += 1
+        # The same timezone as Game.count_by_end_date
+        last_date = timezone.localdate(season.end_datetime)
+        first_date = timezone.localdate(season.start_datetime)
 
     weekday = last_date.weekday()
 
@@ -56,7 +58,7 @@ def games_heatmap_data(games, season: Season) -> dict[str, Any]:
                 categories.append("")
 
         if date >= first_date:
-            played = games_played[date]
+            played = games_played.get(date, 0)
         else:
             played = None
 
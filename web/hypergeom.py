@@ -0,0 +1,13 @@
+from fractions import Fraction
+from math import comb
+
+
+def pmf(k: int, N: int, K: int, n: int) -> Fraction:
+    """
+    Exact probability of drawing k marked items when drawing n items
+    without replacement from N items of which K are marked.
+    """
+    if k < 0 or n - k < 0:
+        return Fraction(0)
+
+    return Fraction(comb(K, k) * comb(N - K, n - k), comb(N, n))
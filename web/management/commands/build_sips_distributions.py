@@ -0,0 +1,110 @@
+import timeit
+from collections import defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from web.stats import (
+    CARD_VALUES,
+    DRAWS,
+    MAX_PLAYER_COUNT,
+    SIPS_DISTRIBUTIONS_FILE,
+    calculate_sips_distributions,
+    combined_distribution,
+    get_sips_distributions,
+    sips_count_distribution,
+)
+
+
+def sips_outcomes_dp(player_count: int) -> dict[int, int]:
+    # The dictionary based dynamic programming previously used for the stats page,
+    # kept as a reference for the precomputed tables
+    outcomes = defaultdict(int)
+    outcomes[0, 0] = 1
+
+    values = [v for _ in range(player_count) for v in CARD_VALUES]
+    for v in values:
+        noutcomes = outcomes.copy()
+        for (total, used), c in outcomes.items():
+            total += v
+            used += 1
+            if used <= DRAWS:
+                noutcomes[total, used] += c
+
+        outcomes = noutcomes
+
+    return {total: c for (total, used), c in outcomes.items() if used == DRAWS}
+
+
+def sips_distributions_dp() -> np.ndarray:
+    table = np.zeros_like(calculate_sips_distributions())
+    for player_count in range(2, MAX_PLAYER_COUNT + 1):
+        outcomes = sips_outcomes_dp(player_count)
+        total_outcomes = sum(outcomes.values())
+        for total, c in outcomes.items():
+            table[player_count, total] = c / total_outcomes
+
+    return table
+
+
+class Command(BaseCommand):
+    help = "Precomputes the exact sips distributions used on the stats page"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only check that the stored distributions are up to date",
+        )
+        parser.add_argument(
+            "--benchmark",
+            action="store_true",
+            help="Compare against the dictionary based dynamic programming",
+        )
+
+    def handle(self, *args, **options):
+        table = calculate_sips_distributions()
+
+        if options["check"]:
+            if not np.array_equal(table, np.load(SIPS_DISTRIBUTIONS_FILE)):
+                raise CommandError(f"{SIPS_DISTRIBUTIONS_FILE} is outdated")
+            self.stdout.write("Sips distributions are up to date")
+        else:
+            SIPS_DISTRIBUTIONS_FILE.parent.mkdir(exist_ok=True)
+            np.save(SIPS_DISTRIBUTIONS_FILE, table)
+            self.stdout.write(f"Saved sips distributions to {SIPS_DISTRIBUTIONS_FILE}")
+
+        if options["benchmark"]:
+            self.benchmark(table)
+
+    def benchmark(self, table):
+        if not np.array_equal(table, sips_distributions_dp()):
+            raise CommandError("Distributions differ from the reference")
+
+        xs = np.arange(table.shape[1])
+        weights = dict.fromkeys(range(2, MAX_PLAYER_COUNT + 1), 1)
+
+        def evaluate_dp():
+            dists = {pc: sips_outcomes_dp(pc) for pc in weights}
+            totals = {pc: sum(o.values()) for pc, o in dists.items()}
+            return [sum(dists[pc].get(x, 0) / totals[pc] for pc in weights) for x in xs]
+
+        def evaluate_load():
+            get_sips_distributions.cache_clear()
+            dist = combined_distribution(weights, sips_count_distribution)
+            return dist.prob_f(xs)
+
+        def evaluate_cached():
+            dist = combined_distribution(weights, sips_count_distribution)
+            return dist.prob_f(xs)
+
+        benchmarks = {
+            "Dictionary DP": evaluate_dp,
+            "NumPy DP": calculate_sips_distributions,
+            "Load and evaluate": evaluate_load,
+            "Evaluate cached tables": evaluate_cached,
+        }
+        for name, f in benchmarks.items():
+            number, _ = timeit.Timer(f).autorange()
+            best = min(timeit.repeat(f, number=number, repeat=5)) / number
+            self.stdout.write(f"{name}: {best * 1000:.3f} ms")
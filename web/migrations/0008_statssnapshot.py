@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:29
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0007_alter_failedgameupload_game_log"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("season_number", models.PositiveIntegerField()),
+                ("player_count", models.PositiveIntegerField()),
+                ("version", models.BigIntegerField()),
+                (
+                    "context",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("created", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "unique_together": {("season_number", "player_count")},
+            },
+        ),
+    ]
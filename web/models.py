@@ -1,7 +1,8 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
-from games.models import User
+from games.models import StatsAggregate, User, all_time_season
 
 
 class FailedGameUpload(models.Model):
@@ -12,3 +13,75 @@ class FailedGameUpload(models.Model):
 
     def __str__(self):
         return f"{self.user}: {self.created}"
+
+
+class StatsSnapshot(models.Model):
+    """
+    The latest generated stats page sections for a season and player count,
+    such that new processes don't have to generate them again.
+    """
+
+    class Meta:
+        unique_together = [("season_number", "player_count")]
+
+    season_number = models.PositiveIntegerField()
+    # Same as StatsAggregate.player_count
+    player_count = models.PositiveIntegerField()
+    # The StatsAggregate version the context was generated from
+    version = models.BigIntegerField()
+    context = models.JSONField(encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.season_number} {self.player_count}: {self.version}"
+
+    @staticmethod
+    def get_player_count(player_count):
+        return player_count or StatsAggregate.ALL_PLAYER_COUNTS
+
+    def is_current(self, version):
+        # The all time heatmap ends today, so it is outdated tomorrow
+        return self.version == version and (
+            self.season_number != all_time_season.number
+            or timezone.localdate(self.created) == timezone.localdate()
+        )
+
+    @classmethod
+    def load(cls, season, player_count, version):
+        snapshot = cls.objects.filter(
+            season_number=season.number,
+            player_count=cls.get_player_count(player_count),
+        ).first()
+        if snapshot and snapshot.is_current(version):
+            return snapshot
+        return None
+
+    @classmethod
+    def store(cls, season, player_count, version, context):
+        key = {
+            "season_number": season.number,
+            "player_count": cls.get_player_count(player_count),
+        }
+        values = {"version": version, "context": context, "created": timezone.now()}
+        # Don't overwrite a snapshot generated from newer data by another process
+        if not cls.objects.filter(**key, version__lte=version).update(**values):
+            cls.objects.bulk_create([cls(**key, **values)], ignore_conflicts=True)
+
+    @classmethod
+    def get_outdated(cls, seasons, player_counts):
+        versions = StatsAggregate.get_versions()
+        snapshots = {
+            (s.season_number, s.player_count): s
+            for s in cls.objects.filter(
+                season_number__in=[season.number for season in seasons]
+            ).defer("context")
+        }
+
+        outdated = []
+        for season in seasons:
+            for player_count in player_counts:
+                key = (season.number, cls.get_player_count(player_count))
+                snapshot = snapshots.get(key)
+                if not snapshot or not snapshot.is_current(versions.get(key, 0)):
+                    outdated.append((season, player_count))
+        return outdated
@@ -0,0 +1,208 @@
+"""
+Keyset (cursor) pagination, which seeks past the ordering keys of the last
+row shown instead of counting and skipping every row before the page.
+
+The cursor is a signed token holding the key values to seek from and the
+position of the page, so links can still show where in the list a page is.
+"""
+
+import datetime
+import json
+from functools import cached_property
+
+from django.core import signing
+from django.db.models import F, Q
+
+# Counting stops here, larger totals are shown as "1,000+"
+APPROXIMATE_COUNT_LIMIT = 1000
+
+
+class CursorEncoder(json.JSONEncoder):
+    # The key values keep their exact type, so seeking never skips a row
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return {"datetime": o.isoformat()}
+        if isinstance(o, datetime.timedelta):
+            return {"timedelta": o // datetime.timedelta(microseconds=1)}
+        return super().default(o)
+
+
+def decode_cursor_value(d):
+    if "datetime" in d:
+        return datetime.datetime.fromisoformat(d["datetime"])
+    if "timedelta" in d:
+        return datetime.timedelta(microseconds=d["timedelta"])
+    return d
+
+
+class CursorSerializer:
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), cls=CursorEncoder).encode(
+            "latin-1"
+        )
+
+    def loads(self, data):
+        return json.loads(data.decode("latin-1"), object_hook=decode_cursor_value)
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, start_index, has_previous, has_next):
+        self.paginator = paginator
+        self.object_list = object_list
+        # 1-based position of the first row, None when it is unknown
+        self.start_index = start_index
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    @property
+    def end_index(self):
+        if self.start_index is None:
+            return None
+        return self.start_index + len(self.object_list) - 1
+
+    def previous_cursor(self):
+        values = self.paginator.get_values(self.object_list[0])
+        return self.paginator.make_cursor(values, self.start_index, before=True)
+
+    def next_cursor(self):
+        values = self.paginator.get_values(self.object_list[-1])
+        next_index = self.end_index and self.end_index + 1
+        return self.paginator.make_cursor(values, next_index)
+
+
+class KeysetPaginator:
+    """
+    keys are (name, expression, descending) tuples, which together must order
+    the rows uniquely and never be null. Each one is annotated on the rows
+    as key_<name>, so the cursor of a page can be read from its first and
+    last row.
+    """
+
+    salt = "web.pagination"
+
+    def __init__(self, queryset, keys, per_page):
+        self.queryset = queryset
+        self.keys = keys
+        self.per_page = per_page
+        self.signature = [[name, descending] for name, _, descending in keys]
+        self.aliases = [f"key_{name}" for name, _, _ in keys]
+
+    def get_values(self, obj):
+        return [getattr(obj, alias) for alias in self.aliases]
+
+    def make_cursor(self, values, index, before=False):
+        """
+        A cursor to the rows after (or before) the given key values.
+        index is the position of the first row after the values,
+        or of the row with the values when going before it.
+        """
+        return signing.dumps(
+            {
+                "keys": self.signature,
+                "values": values,
+                "index": index,
+                "before": before,
+            },
+            salt=self.salt,
+            serializer=CursorSerializer,
+        )
+
+    def load_cursor(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=self.salt, serializer=CursorSerializer)
+        except signing.BadSignature:
+            return None
+
+        # A cursor from another ordering (e.g. an old link) starts over
+        if data.get("keys") != self.signature:
+            return None
+
+        return data
+
+    def get_queryset(self, before=False):
+        qs = self.queryset.annotate(
+            **{alias: expr for alias, (_, expr, _) in zip(self.aliases, self.keys)}
+        )
+        return qs.order_by(
+            *(
+                F(alias).asc() if descending == before else F(alias).desc()
+                for alias, (_, _, descending) in zip(self.aliases, self.keys)
+            )
+        )
+
+    def seek(self, qs, values, before):
+        """
+        Filters to the rows after (or before) the given key values:
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+        """
+        q = Q()
+        equal = {}
+        for alias, (_, _, descending), value in zip(self.aliases, self.keys, values):
+            lookup = "lt" if descending != before else "gt"
+            q |= Q(**equal, **{f"{alias}__{lookup}": value})
+            equal[alias] = value
+        return qs.filter(q)
+
+    @cached_property
+    def count(self):
+        """
+        The number of rows, up to APPROXIMATE_COUNT_LIMIT + 1.
+        """
+        return self.queryset.order_by()[: APPROXIMATE_COUNT_LIMIT + 1].count()
+
+    @property
+    def count_str(self):
+        if self.count > APPROXIMATE_COUNT_LIMIT:
+            return f"{APPROXIMATE_COUNT_LIMIT:,}+"
+        return f"{self.count:,}"
+
+    def get_page(self, cursor):
+        """
+        cursor is None for the first page, "last" for the last page
+        or a cursor from KeysetPage.previous_cursor() or next_cursor().
+        """
+        if cursor == "last":
+            rows = list(self.get_queryset(before=True)[: self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            start_index = None
+            if self.count <= APPROXIMATE_COUNT_LIMIT:
+                start_index = self.count - len(rows) + 1
+            return KeysetPage(self, rows, start_index, has_previous, False)
+
+        data = cursor and self.load_cursor(cursor)
+        if not data:
+            rows = list(self.get_queryset()[: self.per_page + 1])
+            return KeysetPage(
+                self, rows[: self.per_page], 1, False, len(rows) > self.per_page
+            )
+
+        before = data["before"]
+        qs = self.seek(self.get_queryset(before), data["values"], before)
+        rows = list(qs[: self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if not rows:
+            # The rows around the cursor have been deleted since
+            return self.get_page(None)
+
+        index = data["index"]
+
+        if before:
+            rows.reverse()
+            start_index = index and max(index - len(rows), 1)
+            return KeysetPage(self, rows, start_index, more, True)
+
+        return KeysetPage(self, rows, index, True, more)
@@ -1,86 +1,144 @@
 import datetime
-from collections import Counter, defaultdict
+import functools
+import logging
+import math
 from dataclasses import dataclass
-from threading import Thread
+from pathlib import Path
 from typing import Any, Callable, Optional
 
-from django.db.models import Sum
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import transaction
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from django.urls import reverse
-from scipy.stats import hypergeom
+from django.utils import timezone
 
 from academy.utils import is_running_real_server
 from games.models import (
-    Card,
-    Chug,
     Game,
-    GamePlayerStat,
     Season,
+    StatsAggregate,
     all_time_season,
     filter_season_and_player_count,
+    get_all_player_counts,
+    get_all_seasons,
 )
-from games.utils import get_milliseconds
 
-from .heatmap import games_heatmap_data
-from .utils import get_all_seasons, round_timedelta
+from . import hypergeom
+from .heatmap import heatmap_data
+from .models import StatsSnapshot
+from .utils import round_timedelta
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
 class Distribution:
     name: str
-    prob_f: Callable[[int], float]
+    # Evaluated on an array of x values
+    prob_f: Callable[[np.ndarray], np.ndarray]
 
 
-def sips_count_distribution(player_count: int) -> Distribution:
-    # Exact probability
-    def get_outcomes(values: list[int], draws: int) -> dict[int, int]:
-        outcomes = defaultdict(int)
+MAX_PLAYER_COUNT = 6
+CARD_VALUES = range(2, 14 + 1)
+DRAWS = len(CARD_VALUES)
+MAX_SIPS = max(CARD_VALUES) * DRAWS
+
+# Precomputed by the build_sips_distributions command
+SIPS_DISTRIBUTIONS_FILE = Path(__file__).parent / "data" / "sips_distributions.npy"
+
+
+def calculate_sips_distributions() -> np.ndarray:
+    """
+    Exact distribution of the sum of the first 13 cards for each player count,
+    as an array indexed by [player_count, sips].
+
+    Uses the coefficient of y^13 in prod_v (1 + y * x^v)^player_count,
+    expanded with one array operation per card value and count.
+    """
+    table = np.zeros((MAX_PLAYER_COUNT + 1, MAX_SIPS + 1))
+
+    for player_count in range(2, MAX_PLAYER_COUNT + 1):
+        # outcomes[used, total] is the number of ways to draw
+        # `used` cards summing to `total`
+        outcomes = np.zeros((DRAWS + 1, MAX_SIPS + 1), dtype=np.int64)
         outcomes[0, 0] = 1
 
-        for v in values:
-            noutcomes = outcomes.copy()
-            for (total, used), c in outcomes.items():
-                total += v
-                used += 1
-                if used <= draws:
-                    noutcomes[total, used] += c
+        for v in CARD_VALUES:
+            new_outcomes = outcomes.copy()
+            for k in range(1, player_count + 1):
+                new_outcomes[k:, k * v :] += (
+                    math.comb(player_count, k) * outcomes[:-k, : -k * v]
+                )
+            outcomes = new_outcomes
 
-            outcomes = noutcomes
+        counts = outcomes[DRAWS]
+        table[player_count] = counts / counts.sum()
 
-        return {total: c for (total, used), c in outcomes.items() if used == draws}
+    return table
 
-    values = [i for _ in range(player_count) for i in range(2, 15)]
-    outcomes = get_outcomes(values, 13)
-    total_outcomes = sum(outcomes.values())
 
-    return Distribution(
-        name=f"SumP({player_count})",
-        prob_f=lambda x: outcomes.get(x, 0) / total_outcomes,
+@functools.cache
+def get_sips_distributions() -> np.ndarray:
+    return np.load(SIPS_DISTRIBUTIONS_FILE)
+
+
+def table_distribution(name: str, probs: np.ndarray) -> Distribution:
+    def prob_f(xs: np.ndarray) -> np.ndarray:
+        xs = np.asarray(xs)
+        valid = (0 <= xs) & (xs < len(probs))
+        return np.where(valid, probs[np.where(valid, xs, 0)], 0.0)
+
+    return Distribution(name=name, prob_f=prob_f)
+
+
+def sips_count_distribution(player_count: int) -> Distribution:
+    # Exact probability
+    return table_distribution(
+        f"SumP({player_count})", get_sips_distributions()[player_count]
     )
 
 
+def chug_parameters(player_count: int) -> tuple[int, int, int]:
+    # The number of chugs in the first 13 cards drawn from a deck
+    # with one ace per player
+    return DRAWS * player_count, player_count, DRAWS
+
+
+# chug_table[player_count, chugs] is the exact probability of the number of chugs
+chug_table = np.array(
+    [
+        [
+            float(hypergeom.pmf(chugs, *chug_parameters(player_count)))
+            if player_count >= 2
+            else 0.0
+            for chugs in range(MAX_PLAYER_COUNT + 1)
+        ]
+        for player_count in range(MAX_PLAYER_COUNT + 1)
+    ]
+)
+
+
 def chug_count_distribution(player_count: int) -> Distribution:
     # Exact probability
-    N = 13 * player_count
-    K = player_count
-    n = 13
-    rv = hypergeom(N, K, n)
-    pmf = rv.pmf  # type: ignore
-    return Distribution(name=f"HyperGeometric({N}, {K}, {n})", prob_f=pmf)
+    N, K, n = chug_parameters(player_count)
+    return table_distribution(
+        f"HyperGeometric({N}, {K}, {n})", chug_table[player_count]
+    )
 
 
 def combined_distribution(
-    season: Season,
+    weights: dict[int, int],
     dist_f: Callable[[int], Distribution],
 ) -> Distribution:
     ds = []
     ws = []
-    for player_count in range(2, 6 + 1):
+    for player_count in range(2, MAX_PLAYER_COUNT + 1):
         ds.append(dist_f(player_count))
-        ws.append(
-            GamePlayerStat.get_stats_with_player_count(season, player_count).count()
-        )
+        ws.append(weights.get(player_count, 0))
 
     total_ws = sum(ws)
 
@@ -91,144 +149,161 @@ def combined_distribution(
     )
 
 
-def generate_context_data(
-    season: Season, player_count: Optional[int]
-) -> dict[str, Any]:
-    context = {}
+Counts = dict[str, dict[int, int]]
 
-    games = filter_season_and_player_count(Game.objects, season, player_count)
 
-    total_sips = (
-        Card.objects.filter(game__id__in=games).aggregate(total_sips=Sum("value"))[
-            "total_sips"
-        ]
-        or 0
+def generate_game_stats(
+    season: Season, player_count: Optional[int], counts: Counts
+) -> dict[str, Any]:
+    def get_total(kind: str) -> int:
+        return counts[kind].get(0, 0)
+
+    total_sips = get_total(StatsAggregate.TOTAL_SIPS)
+    total_duration = datetime.timedelta(
+        microseconds=get_total(StatsAggregate.TOTAL_DURATION_US)
     )
 
-    games_with_durations = Game.add_durations(games)
+    return {
+        "game_stats": {
+            "total_games": get_total(StatsAggregate.TOTAL_GAMES),
+            "total_dnf": get_total(StatsAggregate.TOTAL_DNF),
+            "total_sips": total_sips,
+            "total_beers": total_sips / 14,
+            "total_duration": str(round_timedelta(total_duration)),
+        }
+    }
 
-    total_duration = games_with_durations.aggregate(total_duration=Sum("duration"))[
-        "total_duration"
-    ] or datetime.timedelta(0)
 
-    context["game_stats"] = {
-        "total_games": games.count(),
-        "total_dnf": games.filter(dnf=True).count(),
-        "total_sips": total_sips,
-        "total_beers": total_sips / 14,
-        "total_duration": str(round_timedelta(total_duration)),
+def generate_heatmap(
+    season: Season, player_count: Optional[int], counts: Counts
+) -> dict[str, Any]:
+    return {
+        "heatmap_data": heatmap_data(
+            {
+                datetime.date.fromordinal(bucket): v
+                for bucket, v in counts[StatsAggregate.HEATMAP].items()
+            },
+            season,
+        )
     }
 
-    games_played = Counter()
-    for g in games.all():
-        if g.end_datetime:
-            games_played[g.end_datetime.date()] += 1
 
-    context["heatmap_data"] = games_heatmap_data(games, season)
+def generate_distribution_data(
+    season: Season,
+    player_count: Optional[int],
+    counts: Counts,
+    kind: str,
+    base_dist: Callable[[int], Distribution],
+) -> dict[str, Any]:
+    xs = []
+    ys = []
+    probs = []
+    dist_str = None
+    d = counts[kind]
+    if d:
+        if player_count is None:
+            weights = StatsAggregate.get_totals_by_player_count(season, kind)
+            dist = combined_distribution(weights, base_dist)
+        else:
+            dist = base_dist(player_count)
+
+        dist_str = dist.name
+
+        xs = list(range(min(d), max(d) + 1))
+        ys = [d.get(x, 0) for x in xs]
+        probs = dist.prob_f(np.array(xs)).tolist()
+
+    return {
+        "xs": xs,
+        "ys": ys,
+        "total_ys": sum(ys),
+        "probs": probs,
+        "probs_exact": True,
+        "dist_str": dist_str,
+    }
 
-    stat_types = {
-        "sips_data": (
-            GamePlayerStat.get_sips_distribution(season, player_count),
-            sips_count_distribution,
-        ),
-        "chugs_data": (
-            GamePlayerStat.get_chugs_distribution(season, player_count),
-            chug_count_distribution,
+
+def generate_sips(
+    season: Season, player_count: Optional[int], counts: Counts
+) -> dict[str, Any]:
+    return {
+        "sips_data": generate_distribution_data(
+            season, player_count, counts, StatsAggregate.SIPS, sips_count_distribution
+        )
+    }
+
+
+def generate_chugs(
+    season: Season, player_count: Optional[int], counts: Counts
+) -> dict[str, Any]:
+    table = []
+    for pcount in range(2, MAX_PLAYER_COUNT + 1):
+        probs = (chug_table[pcount] * 100).tolist()
+        table.append(
+            [pcount, *(p if chugs <= pcount else None for chugs, p in enumerate(probs))]
+        )
+
+    return {
+        "chugs_data": generate_distribution_data(
+            season, player_count, counts, StatsAggregate.CHUGS, chug_count_distribution
         ),
+        "chug_table_header": [
+            "Players\xa0\\\xa0Chugs",
+            *range(MAX_PLAYER_COUNT + 1),
+        ],
+        "chug_table": table,
     }
 
-    for name, (stats, base_dist) in stat_types.items():
-        xs = []
-        ys = []
-        probs = []
-        dist_str = None
-        if stats.exists():
-            d = {s["value"]: s["value__count"] for s in stats}
-            if player_count is None:
-                dist = combined_distribution(season, base_dist)
-            else:
-                dist = base_dist(player_count)
-
-            dist_str = dist.name
-
-            for x in range(stats.first()["value"], stats.last()["value"] + 1):
-                xs.append(x)
-                ys.append(d.get(x, 0))
-
-                if dist:
-                    probs.append(dist.prob_f(x))
-
-        context[name] = {
-            "xs": xs,
-            "ys": ys,
-            "total_ys": sum(ys),
-            "probs": probs,
-            "probs_exact": True,
-            "dist_str": dist_str,
-        }
 
-    BUCKETS = 60
-    chugs = filter_season_and_player_count(
-        Chug.objects, season, player_count, key="card__game"
-    )
-    duration_data = [
-        {
-            "name": "duration_data",
-            "max_duration": 4,
-            "max_duration_unit": "hours",
-            "durations": lambda max_duration: (
-                g["duration"]
-                for g in games_with_durations.filter(
-                    dnf=False, duration__lte=max_duration
-                ).values("duration")
-            ),
-            "format": str,
-        },
-        {
-            "name": "chug_duration_data",
-            "max_duration": 15,
-            "max_duration_unit": "seconds",
-            "durations": lambda max_duration: (
-                datetime.timedelta(milliseconds=c["duration_ms"])
-                for c in chugs.filter(
-                    duration_ms__lte=get_milliseconds(max_duration)
-                ).values("duration_ms")
-            ),
-            "format": lambda td: f"{td.total_seconds():.2f}",
-        },
-    ]
+def generate_duration_histogram(
+    counts: Counts, kind: str, max_duration: str, format: Callable
+) -> dict[str, Any]:
+    bucket_span = StatsAggregate.get_bucket_span(kind)
+    occurrences = counts[kind]
+    buckets = StatsAggregate.DURATION_BUCKETS
+
+    return {
+        "total_ys": sum(occurrences.values()),
+        "bucket_span_seconds": bucket_span.total_seconds(),
+        "max_duration": max_duration,
+        "xs": [format((i + 1) * bucket_span) for i in range(buckets)],
+        "ys": [occurrences.get(i, 0) for i in range(buckets)],
+    }
 
-    for d in duration_data:
-        max_duration = datetime.timedelta(**{d["max_duration_unit"]: d["max_duration"]})
-        bucket_span = max_duration / BUCKETS
-        occurrences = Counter()
-        for duration in d["durations"](max_duration):
-            x = int(duration / bucket_span)
-            occurrences[x] += 1
-
-        context[d["name"]] = {
-            "total_ys": sum(occurrences.values()),
-            "bucket_span_seconds": bucket_span.total_seconds(),
-            "max_duration": f"{d['max_duration']} {d['max_duration_unit']}",
-            "xs": [d["format"]((i + 1) * bucket_span) for i in range(BUCKETS)],
-            "ys": [occurrences[i] for i in range(BUCKETS)],
-        }
 
-    context["chug_table_header"] = ["Players\xa0\\\xa0Chugs", *range(6 + 1)]
-    context["chug_table"] = []
-    for pcount in range(2, 6 + 1):
-        row = [pcount]
-        context["chug_table"].append(row)
-        dist = chug_count_distribution(pcount)
-        for chugs in range(6 + 1):
-            row.append(dist.prob_f(chugs) * 100 if chugs <= pcount else None)
+def generate_duration(
+    season: Season, player_count: Optional[int], counts: Counts
+) -> dict[str, Any]:
+    return {
+        "duration_data": generate_duration_histogram(
+            counts, StatsAggregate.DURATION, "4 hours", str
+        )
+    }
+
+
+def generate_chug_duration(
+    season: Season, player_count: Optional[int], counts: Counts
+) -> dict[str, Any]:
+    return {
+        "chug_duration_data": generate_duration_histogram(
+            counts,
+            StatsAggregate.CHUG_DURATION,
+            "15 seconds",
+            lambda td: f"{td.total_seconds():.2f}",
+        )
+    }
 
-    context["location_data"] = []
+
+def generate_locations(
+    season: Season, player_count: Optional[int], counts: Counts
+) -> dict[str, Any]:
+    games = filter_season_and_player_count(Game.objects, season, player_count)
+    location_data = []
     for g in games.filter(
         location_latitude__isnull=False, location_accuracy__lte=100 * 1000
     ):
         game_url = reverse("game_detail", args=[g.id])
-        context["location_data"].append(
+        location_data.append(
             {
                 "latitude": g.location_latitude,
                 "longitude": g.location_longitude,
@@ -236,52 +311,261 @@ def generate_context_data(
             }
         )
 
-    return context
+    return {"location_data": location_data}
 
 
-CONTEXT_DATA_CACHE = {}
+# Each section of the stats page can be generated and loaded on its own
+SECTIONS: dict[str, Callable[[Season, Optional[int], Counts], dict[str, Any]]] = {
+    "game_stats": generate_game_stats,
+    "heatmap": generate_heatmap,
+    "sips": generate_sips,
+    "chugs": generate_chugs,
+    "duration": generate_duration,
+    "chug_duration": generate_chug_duration,
+    "locations": generate_locations,
+}
 
 
-def get_context_data(season: Season, player_count: Optional[int]) -> dict[str, Any]:
-    context = CONTEXT_DATA_CACHE.get((season, player_count))
-    if context is None:
-        context = populate_cache(season, player_count)
+def generate_section_data(
+    season: Season, player_count: Optional[int], section: str
+) -> dict[str, Any]:
+    counts = StatsAggregate.get_counts(season, player_count)
+    return SECTIONS[section](season, player_count, counts)
+
+
+def generate_sections(
+    season: Season, player_count: Optional[int]
+) -> dict[str, dict[str, Any]]:
+    counts = StatsAggregate.get_counts(season, player_count)
+    return {
+        section: generate(season, player_count, counts)
+        for section, generate in SECTIONS.items()
+    }
+
+
+def merge_sections(sections: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    context = {}
+    for data in sections.values():
+        context |= data
     return context
 
 
-def populate_cache(season: Season, player_count: Optional[int]) -> dict[str, Any]:
-    context = CONTEXT_DATA_CACHE[season, player_count] = generate_context_data(
-        season, player_count
+def generate_context_data(
+    season: Season, player_count: Optional[int]
+) -> dict[str, Any]:
+    return merge_sections(generate_sections(season, player_count))
+
+
+# Generated contexts are stored in a cache shared by every process,
+# and persisted as a StatsSnapshot for when the cache is empty (e.g. after a deploy).
+# They are keyed by the version of the aggregates they are generated from,
+# which is incremented whenever a game in the season changes,
+# so an outdated context is never returned.
+STATS_CACHE = "stats"
+
+
+def get_stats_cache() -> BaseCache:
+    return caches[STATS_CACHE]
+
+
+def _key_str(season: Season, player_count: Optional[int]) -> str:
+    return f"{season.number}:{player_count or 'all'}"
+
+
+def _version_str(season: Season, version: int) -> str:
+    # The all time heatmap ends today, so it also changes every day
+    if season == all_time_season:
+        return f"{version}:{timezone.localdate().isoformat()}"
+    return str(version)
+
+
+def _context_key(season: Season, player_count: Optional[int], version: int) -> str:
+    return (
+        f"stats_context:{_key_str(season, player_count)}:"
+        f"{_version_str(season, version)}"
     )
-    return context
 
 
-def init_cache(
+def _section_key(
+    season: Season, player_count: Optional[int], section: str, version: int
+) -> str:
+    return (
+        f"stats_section:{_key_str(season, player_count)}:{section}:"
+        f"{_version_str(season, version)}"
+    )
+
+
+def get_sections(
+    season: Season, player_count: Optional[int]
+) -> tuple[datetime.datetime, dict[str, dict[str, Any]]]:
+    """
+    Returns when the sections were generated and the data of every section.
+    """
+    # Note that the version must be read before generating the context,
+    # such that the context is at least as new as the version it is stored as
+    version = StatsAggregate.get_version(season, player_count)
+    key = _context_key(season, player_count, version)
+    entry = get_stats_cache().get(key)
+    if entry is None:
+        snapshot = StatsSnapshot.load(season, player_count, version)
+        if snapshot:
+            entry = (snapshot.created, snapshot.context)
+        else:
+            entry = (timezone.now(), generate_sections(season, player_count))
+            StatsSnapshot.store(season, player_count, version, entry[1])
+        get_stats_cache().set(key, entry)
+    return entry
+
+
+def get_context_data(season: Season, player_count: Optional[int]) -> dict[str, Any]:
+    _, sections = get_sections(season, player_count)
+    return merge_sections(sections)
+
+
+def get_section_data(
+    season: Season, player_count: Optional[int], section: str
+) -> tuple[str, datetime.datetime, dict[str, Any]]:
+    """
+    Returns an ETag, when the data was generated and the data of a single section.
+
+    Only the requested section is generated if it isn't cached or snapshotted,
+    such that every section of the page can load independently.
+    """
+    version = StatsAggregate.get_version(season, player_count)
+    key = _section_key(season, player_count, section, version)
+    cache = get_stats_cache()
+    entry = cache.get(key)
+    if entry is None:
+        context_entry = cache.get(_context_key(season, player_count, version))
+        if context_entry is None:
+            snapshot = StatsSnapshot.load(season, player_count, version)
+            if snapshot:
+                context_entry = (snapshot.created, snapshot.context)
+
+        if context_entry:
+            modified, sections = context_entry
+            entry = (modified, sections[section])
+        else:
+            entry = (
+                timezone.now(),
+                generate_section_data(season, player_count, section),
+            )
+        cache.set(key, entry)
+
+    modified, data = entry
+    return f'"{key}"', modified, data
+
+
+# Rebuilds are delayed, such that a burst of invalidations
+# (e.g. deleting many games in the admin) only rebuilds each context once
+REBUILD_DELAY = datetime.timedelta(seconds=10)
+# Maximum number of contexts being rebuilt at the same time
+REBUILD_CONCURRENCY = 2
+# Upper bound on how long a rebuild can take,
+# in case a worker dies without releasing its markers
+REBUILD_TIMEOUT = datetime.timedelta(minutes=10)
+
+
+def _rebuild_pending_key(season: Season, player_count: Optional[int]) -> str:
+    return f"stats_rebuild_pending:{_key_str(season, player_count)}"
+
+
+def _rebuild_slot_key(slot: int) -> str:
+    return f"stats_rebuild_slot:{slot}"
+
+
+def rebuilds_are_eager() -> bool:
+    # Eager tasks (e.g. in development) run inline and ignore the delay,
+    # so the contexts are generated when they are requested instead
+    return getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False)
+
+
+def schedule_rebuild(keys: list[tuple[Season, Optional[int]]]) -> None:
+    from .tasks import rebuild_stats_context
+
+    if rebuilds_are_eager():
+        return
+
+    cache = get_stats_cache()
+    for season, player_count in keys:
+        # If a rebuild is already pending, it will pick up this change too
+        if cache.add(
+            _rebuild_pending_key(season, player_count),
+            True,
+            timeout=REBUILD_TIMEOUT.total_seconds(),
+        ):
+            rebuild_stats_context.apply_async(
+                (season.number, player_count),
+                countdown=REBUILD_DELAY.total_seconds(),
+            )
+
+
+def get_rebuild_queue_depth() -> int:
+    keys = [
+        _rebuild_pending_key(season, player_count)
+        for season in get_all_seasons()
+        for player_count in get_all_player_counts()
+    ]
+    return len(get_stats_cache().get_many(keys))
+
+
+def acquire_rebuild_slot() -> Optional[int]:
+    cache = get_stats_cache()
+    for slot in range(REBUILD_CONCURRENCY):
+        if cache.add(
+            _rebuild_slot_key(slot), True, timeout=REBUILD_TIMEOUT.total_seconds()
+        ):
+            return slot
+    return None
+
+
+def release_rebuild_slot(slot: int) -> None:
+    get_stats_cache().delete(_rebuild_slot_key(slot))
+
+
+def rebuild_context(season: Season, player_count: Optional[int]) -> None:
+    # Invalidations from now on must schedule a new rebuild,
+    # as this one might not include them
+    get_stats_cache().delete(_rebuild_pending_key(season, player_count))
+    get_sections(season, player_count)
+
+
+def schedule_outdated_rebuilds(
     seasons: Optional[list[Season]] = None,
     player_counts: Optional[list[Optional[int]]] = None,
 ) -> None:
     seasons = seasons or get_all_seasons()
-    player_counts = player_counts or [None] + list(range(2, 6 + 1))
+    player_counts = player_counts or get_all_player_counts()
+    # Contexts with an up to date snapshot are loaded from it when needed
+    schedule_rebuild(StatsSnapshot.get_outdated(seasons, player_counts))
+    logger.info("Stats cache rebuilds queued: %d", get_rebuild_queue_depth())
 
-    def aux() -> None:
-        print("Initializing stats cache...")
-        for season in seasons:
-            for player_count in player_counts:
-                populate_cache(season, player_count)
-        print("Initialized stats cache.")
 
-    if not is_running_real_server():
+def init_cache() -> None:
+    from .tasks import rebuild_outdated_stats_contexts
+
+    if not is_running_real_server() or rebuilds_are_eager():
         return
 
-    thread = Thread(target=aux)
-    thread.start()
+    # The database shouldn't be queried while the apps are loading,
+    # so the snapshots are checked by a worker
+    rebuild_outdated_stats_contexts.delay()
 
 
 def reinit_caches_containing_game(game: Game) -> None:
-    init_cache(
-        seasons=[all_time_season, game.get_season()],
-        player_counts=[None, game.players.count()],
-    )
+    seasons = [all_time_season]
+    game_season = game.get_season()
+    if game_season:
+        seasons.append(game_season)
+    keys = [
+        (season, player_count)
+        for season in seasons
+        for player_count in [None, game.players.count()]
+    ]
+
+    # The game (and its stats) might not have been committed yet,
+    # so wait until then, or other processes will see the old data
+    transaction.on_commit(lambda: schedule_rebuild(keys))
 
 
 @receiver(pre_delete, sender=Game)
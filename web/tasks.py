@@ -0,0 +1,22 @@
+from celery import shared_task
+
+from games.models import Season
+
+from . import stats
+
+
+@shared_task(bind=True, max_retries=None)
+def rebuild_stats_context(self, season_number, player_count):
+    slot = stats.acquire_rebuild_slot()
+    if slot is None:
+        raise self.retry(countdown=stats.REBUILD_DELAY.total_seconds())
+
+    try:
+        stats.rebuild_context(Season.from_number(season_number), player_count)
+    finally:
+        stats.release_rebuild_slot(slot)
+
+
+@shared_task
+def rebuild_outdated_stats_contexts():
+    stats.schedule_outdated_rebuilds()
@@ -1,9 +1,37 @@
-from django.test import Client, TestCase
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from games.models import Card, Chug, Game, GamePlayer, User
+from games.models import (
+    Card,
+    Chug,
+    Game,
+    GamePlayer,
+    GamePlayerStat,
+    PlayerStat,
+    RankingEntry,
+    Season,
+    StatsAggregate,
+    StatsRecalculationPartition,
+    User,
+    all_time_season,
+    retract_stats_of_game,
+)
+from games import recalculation, tasks
+from games.ranking import RANKINGS, get_ranks
 from games.utils import get_milliseconds
 from games.views import update_stats_on_game_finished
+from web import hypergeom, stats
+from web.heatmap import heatmap_data
+from web.models import StatsSnapshot
+from web.views import RANKING_PAGE_LIMIT, get_ranking_url
+from web.management.commands.build_sips_distributions import sips_outcomes_dp
 
 
 def create_game(self):
@@ -54,6 +82,37 @@ class GameViewTest(TestCase):
         self.game.save()
         self.assert_can_render_pages()
 
+    def test_stored_player_stats(self):
+        stored = list(self.game.get_player_stats())
+        for gp in self.game.gameplayer_set.all():
+            self.assertIsNotNone(gp.total_sips)
+
+        self.game.gameplayer_set.update(**dict.fromkeys(GamePlayer.RESULT_FIELDS))
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(list(game.get_player_stats()), stored)
+
+    def test_snapshot_queries(self):
+        game = Game.objects.get(id=self.game.id)
+        with self.assertNumQueries(2):
+            list(game.get_player_stats())
+            list(game.cards_by_round())
+            list(game.get_turn_durations())
+            game.all_cards_done()
+            game.get_last_activity_time()
+            game.get_duration()
+
+    def test_season_and_player_count(self):
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(game.get_season(), Season.current_season())
+        self.assertEqual(game.player_count, 2)
+
+        game.gameplayer_set.get(position=1).delete()
+        game.end_datetime = None
+        game.save()
+        game = Game.objects.get(id=self.game.id)
+        self.assertIsNone(game.season_number)
+        self.assertEqual(game.player_count, 1)
+
     def test_game_without_card_times(self):
         for c in self.game.ordered_cards():
             c.start_delta_ms = None
@@ -103,6 +162,65 @@ class ViewTest(TestCase):
         create_game(self)
         self.assert_can_render_pages()
 
+    def test_ranking_page_queries(self):
+        season = Season.current_season()
+
+        def add_players(usernames):
+            season_numbers = [season.number, all_time_season.number]
+            for username in usernames:
+                user = User.objects.create(username=username)
+                for season_number in season_numbers:
+                    PlayerStat.objects.create(
+                        user=user,
+                        season_number=season_number,
+                        total_games=1,
+                        total_sips=len(username),
+                    )
+            RankingEntry.update_rankings(season_numbers)
+
+        def get_ranking_queries():
+            # The site settings are loaded and cached on the first request
+            self.client.get("/ranking/")
+            with CaptureQueriesContext(connection) as queries:
+                r = self.client.get("/ranking/")
+            self.assertEqual(r.status_code, 200)
+            return len(queries), r.context["object_list"]
+
+        add_players(["Player"])
+        query_count, object_list = get_ranking_queries()
+        self.assertEqual(len(object_list), 1)
+
+        add_players([f"Player{i}" for i in range(RANKING_PAGE_LIMIT)])
+        self.assertEqual(get_ranking_queries()[0], query_count)
+
+    def test_ranking_pages(self):
+        season = Season.current_season()
+        count = RANKING_PAGE_LIMIT * 2 + 3
+        for i in range(count):
+            user = User.objects.create(username=f"Player{i}")
+            PlayerStat.objects.create(
+                user=user, season_number=season.number, total_games=1, total_sips=i
+            )
+        RankingEntry.update_rankings([season.number])
+
+        def get_ranks(url):
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            return r.context, [e.rank for e in r.context["object_list"]]
+
+        ranking = RANKINGS[0]
+        url = get_ranking_url(ranking, RANKING_PAGE_LIMIT + 2, season)
+        context, ranks = get_ranks(url)
+        self.assertEqual(ranks, list(range(16, 31)))
+        self.assertEqual(context["paginator_position"], f"16-30 of {count}")
+
+        _, ranks = get_ranks(context["paginator_next_url"])
+        self.assertEqual(ranks, [31, 32, 33])
+        _, ranks = get_ranks(context["paginator_previous_url"])
+        self.assertEqual(ranks, list(range(1, 16)))
+        _, ranks = get_ranks(context["paginator_last_url"])
+        self.assertEqual(ranks, list(range(19, 34)))
+
     def test_player_detail_with_no_game(self):
         self.player1 = User.objects.create(username="Player1")
         r = self.client.get(f"/players/{self.player1.id}/")
@@ -114,6 +232,344 @@ class ViewTest(TestCase):
         self.assertEqual(r.status_code, 200)
 
 
+class StatsCacheTest(TestCase):
+    def setUp(self):
+        stats.get_stats_cache().clear()
+
+    def test_cache_updated_on_game_finished(self):
+        context = stats.get_context_data(all_time_season, None)
+        self.assertEqual(context["game_stats"]["total_games"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_game(self)
+
+        context = stats.get_context_data(all_time_season, None)
+        self.assertEqual(context["game_stats"]["total_games"], 1)
+        self.assertEqual(context["sips_data"]["total_ys"], 2)
+
+    def test_cache_shared_between_calls(self):
+        create_game(self)
+        context = stats.get_context_data(all_time_season, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(stats.get_context_data(all_time_season, 2), context)
+
+    def test_snapshot_used_when_cache_empty(self):
+        create_game(self)
+        self.assertEqual(
+            StatsSnapshot.get_outdated([all_time_season], [None, 2]),
+            [(all_time_season, None), (all_time_season, 2)],
+        )
+        context = stats.get_context_data(all_time_season, 2)
+        self.assertEqual(
+            StatsSnapshot.get_outdated([all_time_season], [None, 2]),
+            [(all_time_season, None)],
+        )
+
+        stats.get_stats_cache().clear()
+        with self.assertNumQueries(2):
+            snapshot_context = stats.get_context_data(all_time_season, 2)
+        self.assertEqual(snapshot_context["game_stats"], context["game_stats"])
+
+        StatsAggregate.update_on_game_finished(self.game)
+        self.assertEqual(
+            StatsSnapshot.get_outdated([all_time_season], [2]),
+            [(all_time_season, 2)],
+        )
+        context = stats.get_context_data(all_time_season, 2)
+        self.assertEqual(context["game_stats"]["total_games"], 2)
+
+    def test_section_api(self):
+        create_game(self)
+        for section in stats.SECTIONS:
+            r = self.client.get(f"/api/stats/0/{section}/?player_count=2")
+            self.assertEqual(r.status_code, 200, section)
+
+        r = self.client.get("/api/stats/0/game_stats/")
+        self.assertEqual(r.json()["game_stats"]["total_games"], 1)
+        r = self.client.get("/api/stats/0/game_stats/", HTTP_IF_NONE_MATCH=r["ETag"])
+        self.assertEqual(r.status_code, 304)
+
+        r = self.client.get("/api/stats/0/foo/")
+        self.assertEqual(r.status_code, 404)
+        r = self.client.get("/api/stats/1000/game_stats/")
+        self.assertEqual(r.status_code, 404)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+    @patch("web.tasks.rebuild_stats_context.apply_async")
+    def test_rebuilds_are_merged(self, apply_async):
+        keys = [
+            (season, player_count)
+            for season in [all_time_season, Season.current_season()]
+            for player_count in [None, 2]
+        ]
+        stats.schedule_rebuild(keys)
+        stats.schedule_rebuild(keys)
+        self.assertEqual(apply_async.call_count, 4)
+        self.assertEqual(stats.get_rebuild_queue_depth(), 4)
+
+        stats.rebuild_context(all_time_season, 2)
+        self.assertEqual(stats.get_rebuild_queue_depth(), 3)
+        stats.schedule_rebuild([(all_time_season, 2)])
+        self.assertEqual(apply_async.call_count, 5)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+    @patch("web.tasks.rebuild_stats_context.apply_async")
+    def test_rebuilds_scheduled_on_game_finished(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_game(self)
+        # All and 2 players for both all time and the current season
+        self.assertEqual(apply_async.call_count, 4)
+
+        # Eager tasks would rebuild inline, so the contexts are left to the requests
+        stats.get_stats_cache().clear()
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.game.save()
+        self.assertEqual(apply_async.call_count, 4)
+
+    def test_rebuild_concurrency(self):
+        slots = [stats.acquire_rebuild_slot() for _ in range(stats.REBUILD_CONCURRENCY)]
+        self.assertNotIn(None, slots)
+        self.assertIsNone(stats.acquire_rebuild_slot())
+        stats.release_rebuild_slot(slots[0])
+        self.assertEqual(stats.acquire_rebuild_slot(), slots[0])
+
+
+class StatsAggregateTest(TestCase):
+    def setUp(self):
+        create_game(self)
+
+    def assert_matches_recalculation(self):
+        for season in [all_time_season, self.game.get_season()]:
+            for player_count in [None, 2, 3]:
+                counts = StatsAggregate.get_counts(season, player_count)
+                actual = {
+                    (kind, bucket): v
+                    for kind, buckets in counts.items()
+                    for bucket, v in buckets.items()
+                    if kind != StatsAggregate.VERSION
+                }
+                expected = StatsAggregate.calculate_counts(season, player_count)
+                self.assertEqual(actual, {k: v for k, v in expected.items() if v})
+
+    def test_game_finished(self):
+        self.assertNotEqual(StatsAggregate.get_version(all_time_season, 2), 0)
+        self.assert_matches_recalculation()
+
+    def test_game_deleted(self):
+        version = StatsAggregate.get_version(all_time_season, 2)
+        self.game.delete()
+        self.assertGreater(StatsAggregate.get_version(all_time_season, 2), version)
+        self.assert_matches_recalculation()
+        self.assertFalse(
+            StatsAggregate.objects.exclude(kind=StatsAggregate.VERSION).exists()
+        )
+
+    def test_heatmap_season_bounds(self):
+        # A season ends at midnight UTC, which is after midnight locally
+        season = Season(2)
+        last_date = timezone.localdate(season.end_datetime)
+        data = heatmap_data({last_date: 1}, season)
+        played = [v for series in data["series"] for v in series["data"]]
+        self.assertIn(1, played)
+
+
+class PlayerStatTest(TestCase):
+    def setUp(self):
+        create_game(self)
+
+        dnf_game = Game.objects.create(start_datetime=timezone.now(), dnf=True)
+        GamePlayer.objects.create(game=dnf_game, user=self.player1, position=0)
+        GamePlayer.objects.create(
+            game=dnf_game, user=self.player2, position=1, dnf=True
+        )
+        update_stats_on_game_finished(dnf_game)
+
+        User.objects.create(username="Player3")
+
+    def get_stats(self):
+        return {
+            (ps.user_id, ps.season_number): {
+                f.attname: getattr(ps, f.attname)
+                for f in PlayerStat._meta.concrete_fields
+                if f.name != "id"
+            }
+            for ps in PlayerStat.objects.all()
+        }
+
+    def assert_matches_recalculate(self, stats):
+        for ps in PlayerStat.objects.all():
+            ps.recalculate()
+            ps.save()
+
+        self.assertEqual(stats.keys(), self.get_stats().keys())
+        for key, expected in self.get_stats().items():
+            for field, value in expected.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(stats[key][field], value, msg=field)
+                else:
+                    self.assertEqual(stats[key][field], value, msg=field)
+
+    def test_game_finished_matches_recalculate(self):
+        self.assert_matches_recalculate(self.get_stats())
+
+    def test_bulk_recalculate_matches_recalculate(self):
+        PlayerStat.recalculate_all()
+        self.assert_matches_recalculate(self.get_stats())
+
+        ps = PlayerStat.objects.get(user=self.player1, season_number=0)
+        self.assertEqual(ps.total_games, 1)
+        self.assertEqual(ps.total_games_with_game_dnf, 1)
+        self.assertIsNotNone(ps.fastest_chug)
+        self.assertEqual(ps.total_timed_chugs, ps.total_chugs)
+        self.assertEqual(ps.total_chug_time_ms, 12345 * ps.total_chugs)
+
+    def test_game_deleted_matches_recalculate(self):
+        self.game.delete()
+        self.assert_matches_recalculate(self.get_stats())
+
+        ps = PlayerStat.objects.get(user=self.player1, season_number=0)
+        self.assertEqual(ps.total_games, 0)
+        self.assertEqual(ps.total_games_with_game_dnf, 1)
+        self.assertIsNone(ps.best_game)
+        self.assertIsNone(ps.fastest_chug)
+
+    def test_unofficial_matches_recalculate(self):
+        retract_stats_of_game(self.game)
+        self.game.official = False
+        self.game.save()
+        update_stats_on_game_finished(self.game)
+        self.assert_matches_recalculate(self.get_stats())
+
+        ps = PlayerStat.objects.get(user=self.player1, season_number=0)
+        self.assertEqual(ps.total_games, 0)
+        self.assertEqual(ps.total_chug_time_ms, 0)
+
+    def test_verify_stats(self):
+        call_command("verify_stats", stdout=StringIO())
+
+        PlayerStat.objects.filter(user=self.player1).update(total_chug_time_ms=1)
+        with self.assertRaises(CommandError):
+            call_command("verify_stats", stdout=StringIO())
+
+    @patch.object(GamePlayerStat, "REBUILD_CHUNK_SIZE", 1)
+    def test_game_player_stats_rebuild(self):
+        def get_game_player_stats():
+            return set(
+                GamePlayerStat.objects.values_list("gameplayer", "value_sum", "chugs")
+            )
+
+        expected = get_game_player_stats()
+        self.assertEqual(len(expected), 2)
+        GamePlayerStat.recalculate_all()
+        self.assertEqual(get_game_player_stats(), expected)
+
+    def test_ranks(self):
+        season = Season.current_season()
+        player3 = User.objects.get(username="Player3")
+
+        def assert_ranks_match_stats():
+            for user in [self.player1, self.player2, player3]:
+                with self.assertNumQueries(1):
+                    ranks = get_ranks(user, season)
+
+                for ranking in RANKINGS:
+                    ranked_users = [ps.user for ps in ranking.get_qs(season)]
+                    expected = (
+                        ranked_users.index(user) + 1 if user in ranked_users else None
+                    )
+                    self.assertEqual(ranks[ranking.key], expected, ranking.key)
+
+        assert_ranks_match_stats()
+        self.assertIsNotNone(get_ranks(self.player1, season)["total_sips"])
+
+        self.game.delete()
+        assert_ranks_match_stats()
+        self.assertIsNone(get_ranks(self.player1, season)["total_sips"])
+
+    def test_ranks_after_user_deleted(self):
+        season = Season.current_season()
+        RANKINGS[0].get_entries(season).first().user.delete()
+        for ranking in RANKINGS:
+            entries = ranking.get_entries(season)
+            self.assertEqual(
+                list(entries.values_list("rank", flat=True)),
+                list(range(1, entries.count() + 1)),
+                ranking.key,
+            )
+
+
+class StatsRecalculationTest(TestCase):
+    def setUp(self):
+        create_game(self)
+        PlayerStat.objects.all().delete()
+        self.recalculation = recalculation.create_recalculation()
+
+    def assert_recalculated(self):
+        self.recalculation.refresh_from_db()
+        self.assertIsNotNone(self.recalculation.finished)
+        self.assertFalse(self.recalculation.partitions.filter(finished=None).exists())
+        ps = PlayerStat.objects.get(user=self.player1, season_number=0)
+        self.assertEqual(ps.total_games, 1)
+
+    def test_resume(self):
+        first = self.recalculation.partitions.first()
+        recalculation.run_partition(first.id)
+        finished = StatsRecalculationPartition.objects.get(id=first.id).finished
+
+        recalculation.run_locally(self.recalculation)
+        self.assert_recalculated()
+        self.assertEqual(
+            StatsRecalculationPartition.objects.get(id=first.id).finished, finished
+        )
+        self.assertIn("player_stats", self.recalculation.status_str())
+
+    @patch("games.tasks.run_stats_recalculation_partition.delay")
+    def test_run_on_workers(self, delay):
+        delay.side_effect = tasks.run_stats_recalculation_partition
+        with self.captureOnCommitCallbacks(execute=True):
+            recalculation.run_on_workers(self.recalculation)
+        self.assertEqual(delay.call_count, self.recalculation.partitions.count())
+        self.assert_recalculated()
+
+    def test_game_without_players(self):
+        GamePlayer.objects.filter(game=self.game).delete()
+        for packed_cards in [self.game.packed_cards, None]:
+            Game.objects.filter(id=self.game.id).update(packed_cards=packed_cards)
+            GamePlayerStat.recalculate_games(Game.objects.all())
+        self.assertFalse(GamePlayerStat.objects.exists())
+
+
+class SipsDistributionTest(TestCase):
+    def test_stored_distributions_are_up_to_date(self):
+        np.testing.assert_array_equal(
+            stats.get_sips_distributions(), stats.calculate_sips_distributions()
+        )
+
+    def test_matches_dictionary_dp(self):
+        outcomes = sips_outcomes_dp(2)
+        total_outcomes = sum(outcomes.values())
+        xs = np.arange(-1, stats.MAX_SIPS + 2)
+        self.assertEqual(
+            stats.sips_count_distribution(2).prob_f(xs).tolist(),
+            [outcomes.get(x, 0) / total_outcomes for x in xs.tolist()],
+        )
+
+
+class ChugDistributionTest(TestCase):
+    def test_chug_table(self):
+        for player_count in range(2, stats.MAX_PLAYER_COUNT + 1):
+            params = stats.chug_parameters(player_count)
+            probs = [hypergeom.pmf(k, *params) for k in range(player_count + 1)]
+            self.assertEqual(sum(probs), 1)
+            # One ace per player in a deck of 13 cards per player
+            self.assertEqual(sum(k * p for k, p in enumerate(probs)), 1)
+            self.assertEqual(
+                stats.chug_table[player_count].tolist(),
+                [float(p) for p in probs] + [0.0] * (6 - player_count),
+            )
+
+
 class WebPushTest(TestCase):
     def post_subscribe(self):
         return self.client.post(
@@ -3,7 +3,7 @@ import datetime
 from django.urls import reverse
 
 from academy.utils import get_absolute_url
-from games.models import Season, all_time_season
+from games.models import Season, all_time_season, get_all_seasons
 from games.ranking import RANKINGS, get_ranking_from_key
 
 
@@ -28,12 +28,6 @@ def updated_query_url(request, updates):
     return url
 
 
-def get_all_seasons() -> list[Season]:
-    return [all_time_season] + list(
-        map(Season, range(Season.current_season().number, 0, -1))
-    )
-
-
 class ChooserData:
     key = None
     reset_keys = []
@@ -79,7 +73,7 @@ class ChooserData:
 
 class SeasonChooser(ChooserData):
     key = "season"
-    reset_keys = ["page"]
+    reset_keys = ["page", "cursor"]
 
     @property
     def values(self):
@@ -97,7 +91,7 @@ class SeasonChooser(ChooserData):
 
 class RankingChooser(ChooserData):
     key = "type"
-    reset_keys = ["page"]
+    reset_keys = ["page", "cursor"]
     values = RANKINGS
 
     def from_str(self, s):
@@ -181,7 +175,10 @@ class SortOrder:
             next_value = None
 
         return {
-            "url": updated_query_url(self.request, {self.key: next_value}),
+            # A cursor only applies to the order it was made in
+            "url": updated_query_url(
+                self.request, {self.key: next_value, "cursor": None}
+            ),
             "sort_icon": self.sort_icon(column),
         }
 
@@ -29,8 +29,10 @@ from django.db.models import (
     OuterRef,
     Subquery,
 )
+from django.db.models.functions import Coalesce
 from django.shortcuts import render
 from django.templatetags.static import static
+from django.urls import reverse
 from django.views.generic import (
     CreateView,
     DetailView,
@@ -50,13 +52,14 @@ from games.models import (
     filter_season,
     all_time_season,
 )
-from games.ranking import RANKINGS, get_ranking_from_key
+from games.ranking import RANKINGS, get_ranking_from_key, get_ranks
 from games.serializers import GameSerializerWithPlayerStats, UserSerializer
 from web import stats
 
 from .forms import FailedGameUploadForm, UserSettingsForm
 from .heatmap import games_heatmap_data
 from .models import FailedGameUpload
+from .pagination import KeysetPaginator
 from .utils import (
     GameOrder,
     PlayerCountChooser,
@@ -67,17 +70,23 @@ from .utils import (
 )
 
 RANKING_PAGE_LIMIT = 15
+# The ranks of a ranking are unique and without gaps
+RANKING_PAGE_KEYS = [("rank", F("rank"), False)]
 
 
-def get_ranking_url(ranking, user, season):
-    rank = ranking.get_rank(user, season)
+def get_ranking_url(ranking, rank, season):
     if rank is None:
         return None
 
-    page = (rank - 1) // RANKING_PAGE_LIMIT + 1
-    return "/ranking/?" + urlencode(
-        {"season": season.number, "type": ranking.key, "page": page}
-    )
+    query = {"season": season.number, "type": ranking.key}
+
+    # Seek to the page after the rows of the pages before it
+    before = (rank - 1) // RANKING_PAGE_LIMIT * RANKING_PAGE_LIMIT
+    if before > 0:
+        paginator = KeysetPaginator(None, RANKING_PAGE_KEYS, RANKING_PAGE_LIMIT)
+        query["cursor"] = paginator.make_cursor([before], before + 1)
+
+    return "/ranking/?" + urlencode(query)
 
 
 def sample_max(population, k):
@@ -153,12 +162,29 @@ class MyLogoutView(LogoutView):
 class PaginatedListView(ListView):
     page_limit = 20
 
+    def get_page_keys(self):
+        """
+        The keys to seek through the rows by (see KeysetPaginator),
+        or None to use numbered pages, which count and skip the rows.
+        """
+        return None
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        paginator = Paginator(context["object_list"], self.page_limit)
+        keys = self.get_page_keys()
+        if keys is None:
+            context.update(self.get_numbered_page_context(context["object_list"]))
+        else:
+            context.update(self.get_keyset_page_context(context["object_list"], keys))
+        return context
+
+    def get_numbered_page_context(self, qs):
+        context = {}
+        paginator = Paginator(qs, self.page_limit)
         page = self.request.GET.get("page")
         object_list = paginator.get_page(page)
         context["object_list"] = object_list
+        context["paginator_position"] = f"{object_list.number} / {paginator.num_pages}"
 
         def page_url(page):
             if page == 1:
@@ -180,6 +206,37 @@ class PaginatedListView(ListView):
 
         return context
 
+    def get_keyset_page_context(self, qs, keys):
+        context = {}
+        paginator = KeysetPaginator(qs, keys, self.page_limit)
+        object_list = paginator.get_page(self.request.GET.get("cursor"))
+        context["object_list"] = object_list
+
+        if object_list.start_index is not None and object_list:
+            context["paginator_position"] = (
+                f"{object_list.start_index}-{object_list.end_index}"
+                f" of {paginator.count_str}"
+            )
+        else:
+            context["paginator_position"] = f"{paginator.count_str} in total"
+
+        def cursor_url(cursor):
+            return updated_query_url(self.request, {"cursor": cursor, "page": None})
+
+        # We want to preserve other query parameters, when changing pages
+        context["paginator_first_url"] = cursor_url(None)
+        context["paginator_last_url"] = cursor_url("last")
+
+        if object_list.has_previous():
+            context["paginator_previous_url"] = cursor_url(
+                object_list.previous_cursor()
+            )
+
+        if object_list.has_next():
+            context["paginator_next_url"] = cursor_url(object_list.next_cursor())
+
+        return context
+
 
 class GameListView(PaginatedListView):
     model = Game
@@ -207,36 +264,60 @@ class GameListView(PaginatedListView):
 
         qs = qs.distinct()
 
-        if self.order.current_column == "end_datetime":
-            # First show live games (but not dnf games),
-            # then show all other games sorted by
-            # end_datetime if it is not null,
-            # otherwise use start_datetime instead
-            qs = qs.order_by(
+        if self.order.current_column == "duration":
+            qs = Game.add_durations(qs)
+
+        return qs
+
+    def get_page_keys(self):
+        if self.order.current_column == "duration":
+            # Always show games with unknown duration last
+            return [
+                (
+                    "duration_unknown",
+                    Case(
+                        When(duration__isnull=True, then=Value(1)),
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    ),
+                    False,
+                ),
+                (
+                    "duration",
+                    Coalesce("duration", Value(datetime.timedelta())),
+                    self.order.reverse,
+                ),
+                ("id", F("id"), False),
+            ]
+
+        # First show live games (but not dnf games),
+        # then show all other games sorted by
+        # end_datetime if it is not null,
+        # otherwise use start_datetime instead
+        keys = [
+            (
+                "live",
                 Case(
                     When(end_datetime__isnull=True, dnf=False, then=Value(0)),
                     default=Value(1),
                     output_field=IntegerField(),
                 ),
+                False,
+            ),
+            (
+                "datetime",
                 Case(
                     When(end_datetime__isnull=True, then="start_datetime"),
                     default="end_datetime",
                     output_field=DateTimeField(),
-                ).desc(),
-                "id",
-            )
-            if self.order.reverse:
-                qs = qs.reverse()
-        elif self.order.current_column == "duration":
-            qs = Game.add_durations(qs)
-
-            # Always show games with unknown duration last
-            if self.order.reverse:
-                qs = qs.order_by(F("duration").desc(nulls_last=True), "id")
-            else:
-                qs = qs.order_by(F("duration").asc(nulls_last=True), "id")
-
-        return qs
+                ),
+                True,
+            ),
+            ("id", F("id"), False),
+        ]
+        if self.order.reverse:
+            keys = [(name, expr, not descending) for name, expr, descending in keys]
+        return keys
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -273,12 +354,13 @@ class PlayerListView(PaginatedListView):
         all_season_stats = PlayerStat.objects.filter(
             user=OuterRef("id"), season_number=0
         )
-        return (
-            User.objects.filter(username__icontains=query)
-            .annotate(total_games=Subquery(all_season_stats.values("total_games")))
-            .order_by("-total_games", "id")
+        return User.objects.filter(username__icontains=query).annotate(
+            total_games=Coalesce(Subquery(all_season_stats.values("total_games")), 0)
         )
 
+    def get_page_keys(self):
+        return [("total_games", F("total_games"), True), ("id", F("id"), False)]
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["query"] = self.request.GET.get("query", "")
@@ -312,12 +394,14 @@ class PlayerDetailView(DetailView):
             )
 
         context["rankings"] = []
+        ranks = get_ranks(self.object, season)
         for ranking in RANKINGS:
+            rank = ranks[ranking.key]
             context["rankings"].append(
                 {
                     "name": ranking.name,
-                    "rank": ranking.get_rank(self.object, season),
-                    "url": get_ranking_url(ranking, self.object, season),
+                    "rank": rank,
+                    "url": get_ranking_url(ranking, rank, season),
                 }
             )
 
@@ -404,7 +488,10 @@ class RankingView(PaginatedListView):
     def get_queryset(self):
         ranking_type = self.request.GET.get("type")
         ranking = get_ranking_from_key(ranking_type) or RANKINGS[0]
-        return ranking.get_qs(self.season)
+        return ranking.get_entries(self.season)
+
+    def get_page_keys(self):
+        return RANKING_PAGE_KEYS
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -413,18 +500,13 @@ class RankingView(PaginatedListView):
         context["ranking_chooser"] = ranking_chooser
         ranking = ranking_chooser.current
 
-        object_list = context["object_list"]
-        start_index = object_list.start_index()
-        for i, o in enumerate(object_list):
-            o.rank = start_index + i
-            o.value = ranking.get_value(o)
-            o.game = ranking.get_game(o)
+        for o in context["object_list"]:
+            o.value_str = ranking.get_value(o)
 
         if self.request.user.is_authenticated:
-            context["user_rank"] = ranking.get_rank(self.request.user, self.season)
-            context["user_rank_url"] = get_ranking_url(
-                ranking, self.request.user, self.season
-            )
+            rank = ranking.get_rank(self.request.user, self.season)
+            context["user_rank"] = rank
+            context["user_rank_url"] = get_ranking_url(ranking, rank, self.season)
 
         return context
 
@@ -440,7 +522,16 @@ class StatsView(TemplateView):
         context["player_count_chooser"] = chooser
         player_count = chooser.current
 
-        context |= stats.get_context_data(season, player_count)
+        # The sections are loaded from the API, so the page renders immediately
+        query = urlencode({"player_count": player_count} if player_count else {})
+        context["section_urls"] = {
+            section: reverse(
+                "stats_section-detail",
+                kwargs={"season_number": season.number, "section": section},
+            )
+            + (f"?{query}" if query else "")
+            for section in stats.SECTIONS
+        }
 
         return context
 